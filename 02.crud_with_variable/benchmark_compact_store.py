@@ -0,0 +1,63 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Memory per todo and filter latency of the dict store next to the columnar store
+# each (store, size) runs in its own process, so the memory figure is that store alone
+# run from this folder: python benchmark_compact_store.py
+# BENCH_SIZES=10000,1000000 skips the 10M run, the dict store needs several GB for it
+# memory is resident-set growth, so at 10k it is within a few pages of noise
+SIZES = [int(size) for size in os.getenv("BENCH_SIZES", "10000,1000000,10000000").split(",")]
+STORES = os.getenv("BENCH_STORES", "memory,compact").split(",")
+REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+
+
+# Resident memory of this process in bytes, Linux only
+def rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def median_ms(function):
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def measure(store_name: str, size: int):
+    if store_name == "compact":
+        from compact_store import CompactTodoStore as Store
+    else:
+        from store import TodoStore as Store
+
+    before = rss()
+    store = Store()
+    started = time.perf_counter()
+    for number in range(size):
+        store.create(f"todo number {number}", number % 3 == 0)
+    build = time.perf_counter() - started
+    per_todo = (rss() - before) / size
+
+    middle = size // 2
+    print(
+        f"{store_name:<8} {size:>9}   {per_todo:6.1f} B/todo   build {build:6.2f}s   "
+        f"completed=true {median_ms(lambda: store.list(completed=True)):8.2f} ms   "
+        f"completed=false {median_ms(lambda: store.list(completed=False)):8.2f} ms   "
+        f"page of 100 {median_ms(lambda: store.list(completed=True, after=middle, limit=100)):6.3f} ms",
+        flush=True,
+    )
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3:
+        measure(sys.argv[1], int(sys.argv[2]))
+    else:
+        # the titles are "todo number N", 13-20 utf-8 bytes
+        for size in SIZES:
+            for store_name in STORES:
+                subprocess.run([sys.executable, __file__, store_name, str(size)], check=True)
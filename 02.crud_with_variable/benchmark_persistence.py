@@ -0,0 +1,121 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from persistence import TodoLog
+from store import TodoStore
+
+# Startup time and durable write throughput of the log-backed store, next to SQLite holding the
+# same todos; run from this folder: python benchmark_persistence.py
+TODOS = int(os.getenv("BENCH_TODOS", "1000000"))
+# records in the log on top of the snapshot at startup
+LOG_TAIL = int(os.getenv("BENCH_LOG_TAIL", "50000"))
+WRITERS = int(os.getenv("BENCH_WRITERS", "32"))
+SECONDS = float(os.getenv("BENCH_SECONDS", "5"))
+# low enough that the write run triggers a compaction of the full state
+SNAPSHOT_EVERY = int(os.getenv("BENCH_SNAPSHOT_EVERY", "20000"))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+# WRITERS threads calling `write` until SECONDS pass, returns (writes per second, latencies)
+def run_writers(write):
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + SECONDS
+
+    def writer(number):
+        own = []
+        count = 0
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            write(number, count)
+            own.append(time.perf_counter() - started)
+            count += 1
+        with lock:
+            latencies.extend(own)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=writer, args=(number,)) for number in range(WRITERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies) / (time.perf_counter() - started), latencies
+
+
+def report(name, startup, rate, latencies):
+    print(
+        f"{name:<12} startup {startup:7.3f}s   {rate:9.0f} writes/s   "
+        f"p50 {percentile(latencies, 0.50) * 1000:6.2f} ms   p99 {percentile(latencies, 0.99) * 1000:7.2f} ms   "
+        f"max {max(latencies) * 1000:7.2f} ms"
+    )
+
+
+def bench_todo_log(directory):
+    todos = [{"title": f"todo number {todo_id}", "id": todo_id, "completed": todo_id % 3 == 0}
+             for todo_id in range(1, TODOS + 1)]
+    log = TodoLog(directory)
+    log._write_snapshot(TODOS + 1, todos)
+    with open(log.log_path, "w", encoding="utf-8") as f:
+        for todo_id in range(1, LOG_TAIL + 1):
+            f.write(f'{{"op":"update","todo":{{"title":"edited {todo_id}","id":{todo_id},"completed":true}}}}\n')
+    del todos
+
+    started = time.perf_counter()
+    store = TodoStore(log=TodoLog(directory, snapshot_every=SNAPSHOT_EVERY))
+    startup = time.perf_counter() - started
+    assert len(store) == TODOS
+
+    rate, latencies = run_writers(lambda number, count: store.create(f"writer {number} todo {count}"))
+    store.close()
+    report("todo log", startup, rate, latencies)
+
+
+def bench_sqlite(directory):
+    path = os.path.join(directory, "todos.db")
+    connection = sqlite3.connect(path)
+    connection.execute("PRAGMA journal_mode = WAL")
+    connection.execute("CREATE TABLE todos (id INTEGER PRIMARY KEY, title TEXT NOT NULL, completed BOOLEAN NOT NULL)")
+    with connection:
+        connection.executemany(
+            "INSERT INTO todos (id, title, completed) VALUES (?, ?, ?)",
+            ((todo_id, f"todo number {todo_id}", todo_id % 3 == 0) for todo_id in range(1, TODOS + 1)),
+        )
+    connection.close()
+
+    # SQLite has nothing to load, startup is opening the file and answering a first query
+    started = time.perf_counter()
+    connection = sqlite3.connect(path)
+    assert connection.execute("SELECT count(*) FROM todos").fetchone()[0] == TODOS
+    startup = time.perf_counter() - started
+    connection.close()
+
+    local = threading.local()
+
+    # synchronous = FULL fsyncs every commit, like the log does before it acknowledges a write
+    def write(number, count):
+        if not hasattr(local, "connection"):
+            local.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+            local.connection.execute("PRAGMA synchronous = FULL")
+        local.connection.execute(
+            "INSERT INTO todos (title, completed) VALUES (?, ?)", (f"writer {number} todo {count}", False)
+        )
+
+    rate, latencies = run_writers(write)
+    report("sqlite wal", startup, rate, latencies)
+
+
+if __name__ == "__main__":
+    print(f"{TODOS} todos, {LOG_TAIL} log records at startup, {WRITERS} writers for {SECONDS:.0f}s")
+    for bench in (bench_todo_log, bench_sqlite):
+        directory = tempfile.mkdtemp(prefix="todo-bench-")
+        try:
+            bench(directory)
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,195 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import compress, repeat
+from typing import Optional
+
+
+# Columnar todo store, 16 bytes + the utf-8 title + 2 bits per todo instead of a dict per todo
+# - ids: array('q'), appended in id order so a slot is found with a binary search
+# - titles: one contiguous bytearray arena, addressed by per-slot offset and length, both
+#   array('I'), so the arena (garbage included) is capped at 4 GiB
+# - live / completed: bitmaps with one bit per slot
+# deletes and title updates leave garbage behind, which is compacted once it outweighs live data
+class CompactTodoStore:
+    # bitmap byte -> its 8 bits as 0/1 bytes, one per slot, for itertools.compress to select with
+    _BYTE_FLAGS = tuple(bytes(byte >> bit & 1 for bit in range(8)) for byte in range(256))
+    ARENA_MAX = 2**32 - 1
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ids = array("q")
+        self._offsets = array("I")
+        self._lengths = array("I")
+        self._arena = bytearray()
+        self._live = bytearray()
+        self._completed = bytearray()
+        self._count = 0
+        self._garbage = 0
+        self._next_id = 1
+
+    def close(self):
+        pass
+
+    def __len__(self):
+        with self._lock:
+            return self._count
+
+    @staticmethod
+    def _get_bit(bitmap, slot):
+        return bitmap[slot >> 3] >> (slot & 7) & 1
+
+    @staticmethod
+    def _set_bit(bitmap, slot, value):
+        if value:
+            bitmap[slot >> 3] |= 1 << (slot & 7)
+        else:
+            bitmap[slot >> 3] &= ~(1 << (slot & 7)) & 0xFF
+
+    def _slot(self, todo_id: int):
+        slot = bisect_left(self._ids, todo_id)
+        if slot < len(self._ids) and self._ids[slot] == todo_id and self._get_bit(self._live, slot):
+            return slot
+        return None
+
+    def _title(self, slot: int):
+        offset = self._offsets[slot]
+        return self._arena[offset:offset + self._lengths[slot]].decode("utf-8")
+
+    def _todo(self, slot: int):
+        return {
+            "title": self._title(slot),
+            "id": self._ids[slot],
+            "completed": bool(self._get_bit(self._completed, slot)),
+        }
+
+    # Checked before a change touches any column, so a full arena leaves the store as it was
+    def _encode_title(self, title: str):
+        encoded = title.encode("utf-8")
+        if len(self._arena) + len(encoded) > self.ARENA_MAX:
+            raise MemoryError("compact todo store is full")
+        return encoded
+
+    def _store_title(self, slot: int, encoded: bytes):
+        self._offsets[slot] = len(self._arena)
+        self._lengths[slot] = len(encoded)
+        self._arena += encoded
+
+    # One 0/1 byte per slot for a bitmap, expanded 8 slots at a time through the lookup table
+    def _flags(self, bitmap):
+        return b"".join(map(self._BYTE_FLAGS.__getitem__, bitmap))
+
+    # Slots whose bits are set in `mask`, an int built from the bitmaps
+    # the AND/NOT and picking out the set slots both run over whole bitmaps in C
+    def _slots(self, mask: int):
+        return compress(range(len(self._ids)), self._flags(mask.to_bytes(len(self._live), "little")))
+
+    # Todos of the slots flagged in `flags`, all with `completed` unless it is None
+    # the columns are walked by itertools.compress; an ASCII arena (the common case) is decoded
+    # with one call and titles are sliced out of the result, otherwise each title is decoded
+    def _todos(self, flags: bytes, completed: Optional[bool]):
+        if completed is None:
+            states = map(bool, compress(self._flags(self._completed), flags))
+        else:
+            states = repeat(completed)
+        rows = zip(compress(self._offsets, flags), compress(self._lengths, flags), compress(self._ids, flags), states)
+        if self._arena.isascii():
+            text = self._arena.decode("ascii")
+            return [{"title": text[offset:offset + length], "id": todo_id, "completed": state}
+                    for offset, length, todo_id, state in rows]
+        arena = self._arena
+        return [{"title": arena[offset:offset + length].decode("utf-8"), "id": todo_id, "completed": state}
+                for offset, length, todo_id, state in rows]
+
+    def _compact(self):
+        ids, offsets, lengths = array("q"), array("I"), array("I")
+        arena, live, completed = bytearray(), bytearray(), bytearray()
+        for slot in self._slots(int.from_bytes(self._live, "little")):
+            new_slot = len(ids)
+            if new_slot & 7 == 0:
+                live.append(0)
+                completed.append(0)
+            start = self._offsets[slot]
+            ids.append(self._ids[slot])
+            offsets.append(len(arena))
+            lengths.append(self._lengths[slot])
+            arena += self._arena[start:start + self._lengths[slot]]
+            self._set_bit(live, new_slot, True)
+            self._set_bit(completed, new_slot, self._get_bit(self._completed, slot))
+        self._ids, self._offsets, self._lengths = ids, offsets, lengths
+        self._arena, self._live, self._completed = arena, live, completed
+        self._garbage = 0
+
+    def _collect(self, garbage: int):
+        self._garbage += garbage
+        dead_slots = len(self._ids) - self._count
+        if self._garbage * 2 > len(self._arena) or dead_slots * 2 > len(self._ids):
+            self._compact()
+
+    def create(self, title: str, completed: bool = False):
+        with self._lock:
+            encoded = self._encode_title(title)
+            todo_id = self._next_id
+            slot = len(self._ids)
+            if slot & 7 == 0:
+                self._live.append(0)
+                self._completed.append(0)
+            self._ids.append(todo_id)
+            self._offsets.append(0)
+            self._lengths.append(0)
+            self._store_title(slot, encoded)
+            self._set_bit(self._live, slot, True)
+            self._set_bit(self._completed, slot, completed)
+            self._count += 1
+            self._next_id += 1
+            return self._todo(slot)
+
+    # Todos with id > `after` in id order, at most `limit` of them
+    # a full listing filters whole bitmaps at once and decodes titles in bulk, a page walks slots
+    # from the cursor instead
+    def list(self, completed: Optional[bool] = None, after: int = 0, limit: Optional[int] = None):
+        with self._lock:
+            if after or limit is not None:
+                page = []
+                for slot in range(bisect_right(self._ids, after), len(self._ids)):
+                    if limit is not None and len(page) >= limit:
+                        break
+                    if not self._get_bit(self._live, slot):
+                        continue
+                    if completed is None or bool(self._get_bit(self._completed, slot)) == completed:
+                        page.append(self._todo(slot))
+                return page
+
+            mask = int.from_bytes(self._live, "little")
+            if completed is not None:
+                completed_bits = int.from_bytes(self._completed, "little")
+                mask &= completed_bits if completed else ~completed_bits
+            return self._todos(self._flags(mask.to_bytes(len(self._live), "little")), completed)
+
+    def get(self, todo_id: int):
+        with self._lock:
+            slot = self._slot(todo_id)
+            return self._todo(slot) if slot is not None else None
+
+    def update(self, todo_id: int, title: str, completed):
+        with self._lock:
+            slot = self._slot(todo_id)
+            if slot is None:
+                return None
+            encoded = self._encode_title(title)
+            garbage = self._lengths[slot]
+            self._store_title(slot, encoded)
+            self._set_bit(self._completed, slot, completed)
+            todo = self._todo(slot)
+            self._collect(garbage)
+            return todo
+
+    def delete(self, todo_id: int):
+        with self._lock:
+            slot = self._slot(todo_id)
+            if slot is None:
+                return False
+            self._set_bit(self._live, slot, False)
+            self._count -= 1
+            self._collect(self._lengths[slot])
+            return True
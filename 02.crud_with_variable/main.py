@@ -1,52 +1,114 @@
+import os
+import time
+import base64
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException, Query, Body
 from typing import List, Optional
+from store import TodoStore
+from persistence import TodoLog
+from shared_store import SharedTodoStore
+from compact_store import CompactTodoStore
 
-app = FastAPI()
+# Storage backend: "memory" (per process), "compact" (columnar, per process)
+# or "shared" (mmap file shared by all uvicorn workers)
+TODO_STORE = os.getenv("TODO_STORE", "memory")
+TODO_SHM_PATH = os.getenv("TODO_SHM_PATH", "/dev/shm/fastapi_todos.bin")
+TODO_SHM_CAPACITY = int(os.getenv("TODO_SHM_CAPACITY", "1000000"))
+
+# Optional durability: set TODO_LOG_DIR to keep an append-only log + snapshots there
+TODO_LOG_DIR = os.getenv("TODO_LOG_DIR")
+TODO_FSYNC_INTERVAL_MS = float(os.getenv("TODO_FSYNC_INTERVAL_MS", "5"))
+TODO_SNAPSHOT_EVERY = int(os.getenv("TODO_SNAPSHOT_EVERY", "100000"))
 
 # In-memory storage
-todos = []
-next_id = 1
+if TODO_STORE == "shared":
+    if TODO_LOG_DIR:
+        raise ValueError("TODO_LOG_DIR is only supported with TODO_STORE=memory")
+    todos = SharedTodoStore(TODO_SHM_PATH, capacity=TODO_SHM_CAPACITY)
+elif TODO_STORE == "compact":
+    if TODO_LOG_DIR:
+        raise ValueError("TODO_LOG_DIR is only supported with TODO_STORE=memory")
+    todos = CompactTodoStore()
+elif TODO_STORE != "memory":
+    raise ValueError(f"unknown TODO_STORE: {TODO_STORE}")
+elif TODO_LOG_DIR:
+    started = time.perf_counter()
+    todos = TodoStore(log=TodoLog(
+        TODO_LOG_DIR,
+        fsync_interval=TODO_FSYNC_INTERVAL_MS / 1000,
+        snapshot_every=TODO_SNAPSHOT_EVERY,
+    ))
+    print(f"loaded {len(todos)} todos from {TODO_LOG_DIR} in {time.perf_counter() - started:.3f}s")
+else:
+    todos = TodoStore()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    todos.close()
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+# Opaque pagination cursor, wraps the last id of the previous page
+def encode_cursor(last_id: int):
+    return base64.urlsafe_b64encode(str(last_id).encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid cursor")
 
 
 # Create a Todo
 @app.post("/api/v1/todos")
 def create_todo(todo= Body(...)):
-    global todos, next_id
     if not todo["title"].strip():
         raise HTTPException(status_code=400, detail="Title is required and cannot be empty")
-    new_todo = {
-        "title": todo["title"],
-        "id": next_id,
-        "completed": todo["completed"] if todo["completed"] is not None else False
-    }
-    todos.append(new_todo)
-    next_id += 1
+    try:
+        new_todo = todos.create(
+            title=todo["title"],
+            completed=todo["completed"] if todo["completed"] is not None else False,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except MemoryError as e:
+        raise HTTPException(status_code=507, detail=str(e))
     return {
         "message": "todo created",
         "data": new_todo
     }
 
 
-# Get all Todos with optional filtering
+# Get all Todos with optional filtering and keyset pagination
 @app.get("/api/v1/todos")
-def get_todos(completed: Optional[bool] = Query(None)):
-    if completed is not None:
-        filtered_todos = [todo for todo in todos if todo["completed"] == completed]
-        return {
-            "message": "todos fetched",
-            "data": filtered_todos
-        }
-    
+def get_todos(
+    completed: Optional[bool] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+):
+    after = decode_cursor(cursor) if cursor else 0
+    # fetch one extra todo to know whether another page exists
+    page = todos.list(completed=completed, after=after, limit=limit + 1 if limit else None)
+    next_cursor = None
+    if limit and len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor(page[-1]["id"])
     return {
         "message": "todos fetched",
-        "data": todos
+        "data": page,
+        "next_cursor": next_cursor
     }
 
 
 # Get a single Todo by ID
 @app.get("/api/v1/todos/{todo_id}")
 def get_todo(todo_id: int):
-    todo = next((todo for todo in todos if todo["id"] == todo_id), None)
+    todo = todos.get(todo_id)
     if todo is None:
         raise HTTPException(status_code=404, detail="todo not found")
     return {
@@ -58,15 +120,19 @@ def get_todo(todo_id: int):
 # Update a Todo by ID
 @app.put("/api/v1/todos/{todo_id}")
 def update_todo(todo_id: int, updated_todo = Body(...)):
-    global todos
-    todo = next((todo for todo in todos if todo["id"] == todo_id), None)
-    if todo is None:
+    if todos.get(todo_id) is None:
         raise HTTPException(status_code=404, detail="todo not found")
     if not updated_todo["title"].strip():
         raise HTTPException(status_code=400, detail="title is required and cannot be empty")
     
-    todo["title"] = updated_todo["title"]
-    todo["completed"] = updated_todo["completed"]
+    try:
+        todo = todos.update(todo_id, title=updated_todo["title"], completed=updated_todo["completed"])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except MemoryError as e:
+        raise HTTPException(status_code=507, detail=str(e))
+    if todo is None:
+        raise HTTPException(status_code=404, detail="todo not found")
     return {
         "message": "todo updated",
         "data": todo
@@ -76,12 +142,8 @@ def update_todo(todo_id: int, updated_todo = Body(...)):
 # Delete a Todo by ID
 @app.delete("/api/v1/todos/{todo_id}")
 def delete_todo(todo_id: int):
-    global todos
-    todo = next((todo for todo in todos if todo["id"] == todo_id), None)
-    if todo is None:
+    if not todos.delete(todo_id):
         raise HTTPException(status_code=404, detail="todo not found")
-    
-    todos = [todo for todo in todos if todo["id"] != todo_id]
     return {"message": "todo deleted"}
 
 
@@ -0,0 +1,218 @@
+import json
+import os
+import threading
+import time
+
+
+# Append-only NDJSON log with group-commit fsync and snapshot compaction
+# - every create/update/delete is appended as one json line
+# - a background thread fsyncs the log every `fsync_interval` seconds, so many writers share one fsync
+# - after `snapshot_every` records the log is rotated out and a background thread writes the full
+#   state to a snapshot, then deletes the rotated log
+class TodoLog:
+    SNAPSHOT_FILE = "todos.snapshot.json"
+    LOG_FILE = "todos.log"
+    # the rotated log, kept until the snapshot that covers it is on disk
+    OLD_LOG_FILE = "todos.log.old"
+    # todos per json.dumps call when writing a snapshot, so the compaction thread keeps handing the
+    # GIL back to the request threads
+    SNAPSHOT_BATCH = 1000
+
+    def __init__(self, directory: str, fsync_interval: float = 0.005, snapshot_every: int = 100_000):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.snapshot_path = os.path.join(directory, self.SNAPSHOT_FILE)
+        self.log_path = os.path.join(directory, self.LOG_FILE)
+        self.old_log_path = os.path.join(directory, self.OLD_LOG_FILE)
+        self.fsync_interval = fsync_interval
+        self.snapshot_every = snapshot_every
+
+        self._lock = threading.Lock()
+        self._synced = threading.Condition(self._lock)
+        # held while fsyncing outside `_lock`, so compaction cannot swap the file underneath
+        self._file_lock = threading.Lock()
+        self._file = None
+        self._written_seq = 0
+        self._synced_seq = 0
+        self._records_since_snapshot = 0
+        self._closed = False
+        self._flusher = None
+        self._compactor = None
+
+    # Load the latest snapshot and replay the log tail on top of it
+    # returns (next_id, todos) where todos is a dict of id -> todo
+    def load(self):
+        next_id = 1
+        todos = {}
+        if os.path.exists(self.snapshot_path):
+            with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            next_id = snapshot["next_id"]
+            todos = {todo["id"]: todo for todo in snapshot["todos"]}
+
+        # a compaction that was cut short left its rotated log behind, which comes before the
+        # current one; it is finished here, as the next rotation would overwrite that file
+        interrupted = os.path.exists(self.old_log_path)
+        if interrupted:
+            next_id, _ = self._replay(self.old_log_path, todos, next_id, truncate=False)
+        next_id, replayed = self._replay(self.log_path, todos, next_id, truncate=True)
+        todos = dict(sorted(todos.items()))
+        if interrupted:
+            self._write_snapshot(next_id, list(todos.values()))
+            os.remove(self.old_log_path)
+            self._sync_directory()
+
+        self._records_since_snapshot = replayed
+        return next_id, todos
+
+    # Apply the records in the log at `path` to `todos`, returns (next_id, records replayed)
+    def _replay(self, path: str, todos: dict, next_id: int, truncate: bool):
+        if not os.path.exists(path):
+            return next_id, 0
+        replayed = 0
+        # binary, so the byte offset after the last complete record is known
+        good = 0
+        with open(path, "rb") as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("unterminated record")
+                    record = json.loads(line)
+                except ValueError:
+                    # torn write from a crash, everything after it was never acknowledged
+                    break
+                if record["op"] == "delete":
+                    todos.pop(record["id"], None)
+                else:
+                    todo = record["todo"]
+                    todos[todo["id"]] = todo
+                    next_id = max(next_id, todo["id"] + 1)
+                replayed += 1
+                good += len(line)
+        # cut the torn tail off before appending, or new records would land behind it and be
+        # skipped by the next replay
+        if truncate and os.path.getsize(path) > good:
+            print(f"warning: discarding {os.path.getsize(path) - good} bytes of torn log tail")
+            with open(path, "r+b") as f:
+                f.truncate(good)
+                f.flush()
+                os.fsync(f.fileno())
+        return next_id, replayed
+
+    def open(self):
+        self._file = open(self.log_path, "a", encoding="utf-8")
+        self._flusher = threading.Thread(target=self._flush_loop, name="todo-log-fsync", daemon=True)
+        self._flusher.start()
+
+    def close(self):
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._lock:
+            self._closed = True
+            self._synced.notify_all()
+        if self._flusher is not None:
+            self._flusher.join()
+        if self._file is not None:
+            self._sync()
+            self._file.close()
+            self._file = None
+
+    # Append a record, returns its sequence number for `wait`
+    def append(self, record: dict):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with self._lock:
+            self._file.write(line)
+            self._written_seq += 1
+            self._records_since_snapshot += 1
+            self._synced.notify_all()
+            return self._written_seq
+
+    # Block until the record with this sequence number has been fsynced
+    def wait(self, seq: int):
+        with self._lock:
+            while self._synced_seq < seq and not self._closed:
+                self._synced.wait()
+
+    def should_compact(self):
+        return self._records_since_snapshot >= self.snapshot_every and self._compactor is None
+
+    # Rotate the log and write a snapshot of `todos` (a list of the live todo dicts) in the background
+    # the caller must hold the store lock, so the list matches the log being rotated out; only the
+    # rotation happens here, a couple of fsyncs rather than serializing the whole state
+    # the store never mutates a todo dict once it is stored (updates replace it), so the snapshot
+    # is exactly the state at the rotation
+    def compact(self, next_id: int, todos: list):
+        with self._file_lock, self._lock:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+            os.replace(self.log_path, self.old_log_path)
+            self._file = open(self.log_path, "w", encoding="utf-8")
+            self._sync_directory()
+            self._records_since_snapshot = 0
+            # everything written so far is in the fsynced old log
+            self._synced_seq = self._written_seq
+            self._synced.notify_all()
+        self._compactor = threading.Thread(
+            target=self._finish_compaction, args=(next_id, todos), name="todo-log-compact", daemon=True
+        )
+        self._compactor.start()
+
+    def _finish_compaction(self, next_id: int, todos: list):
+        try:
+            self._write_snapshot(next_id, todos)
+            os.remove(self.old_log_path)
+            self._sync_directory()
+        except OSError as error:
+            # `_compactor` stays set, so no later rotation overwrites the old log; the next start
+            # replays it and finishes the compaction
+            print(f"error: log compaction failed, the log keeps growing until a restart: {error}")
+            return
+        self._compactor = None
+
+    # Snapshot in the format `load` reads, written in batches and swapped in atomically
+    def _write_snapshot(self, next_id: int, todos: list):
+        tmp_path = self.snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(f'{{"next_id":{next_id},"todos":[')
+            for start in range(0, len(todos), self.SNAPSHOT_BATCH):
+                if start:
+                    f.write(",")
+                f.write(json.dumps(todos[start:start + self.SNAPSHOT_BATCH], separators=(",", ":"))[1:-1])
+            f.write("]}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self._sync_directory()
+
+    def _flush_loop(self):
+        while True:
+            with self._lock:
+                while self._synced_seq == self._written_seq and not self._closed:
+                    self._synced.wait()
+                if self._closed:
+                    return
+            # let concurrent writers pile up behind a single fsync
+            time.sleep(self.fsync_interval)
+            self._sync()
+
+    def _sync(self):
+        with self._file_lock:
+            with self._lock:
+                seq = self._written_seq
+                self._file.flush()
+                fd = self._file.fileno()
+            os.fsync(fd)
+        with self._lock:
+            self._synced_seq = max(self._synced_seq, seq)
+            self._synced.notify_all()
+
+    def _sync_directory(self):
+        if not hasattr(os, "O_DIRECTORY"):
+            return
+        fd = os.open(self.directory, os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
@@ -0,0 +1,185 @@
+import fcntl
+import mmap
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+
+# Todo store in a memory-mapped file shared by every `uvicorn --workers N` process
+# - fixed-width records, the record for id N lives in slot N - 1, so the id index is a direct offset
+# - ids come from a counter in the header, guarded by its own lock byte; each process takes a
+#   block of ID_BLOCK ids at a time and hands them out under a thread lock, so most creates never
+#   touch the cross-process allocator lock. Ids are unique but only increase per process: a todo
+#   created by one worker can get a lower id than one created earlier by another, and ids left in a
+#   block when a worker exits are never used
+# - records are guarded by striped locks (id % STRIPES); fcntl byte-range locks exclude other
+#   processes and a threading.Lock per stripe excludes other threads of the same process
+#
+# file layout:
+#   header: magic, capacity, next_id
+#   lock bytes: never written, only used as fcntl lock targets (allocator + one per stripe)
+#   records: id, state, completed, title length, title
+class SharedTodoStore:
+    MAGIC = b"TODOSHM1"
+    HEADER = struct.Struct("<8sqq")
+    HEADER_SIZE = 64
+    RECORD = struct.Struct("<qBBH")
+    TITLE_MAX = 244
+    RECORD_SIZE = RECORD.size + TITLE_MAX
+    STRIPES = 64
+    ID_BLOCK = 64
+    ALLOCATOR_LOCK = HEADER_SIZE
+    STRIPE_LOCKS = HEADER_SIZE + 1
+    RECORDS_OFFSET = HEADER_SIZE + 128
+
+    EMPTY = 0
+    LIVE = 1
+    DELETED = 2
+
+    def __init__(self, path: str, capacity: int = 1_000_000):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._allocator_lock = threading.Lock()
+        self._stripe_locks = [threading.Lock() for _ in range(self.STRIPES)]
+        # this process's current id block, [next, end), and the pid it was taken by
+        self._block = (0, 0, 0)
+
+        with self._allocator():
+            header = os.pread(self._fd, self.HEADER.size, 0)
+            if len(header) == self.HEADER.size and header[:8] == self.MAGIC:
+                _, capacity, _ = self.HEADER.unpack(header)
+            else:
+                os.ftruncate(self._fd, self.RECORDS_OFFSET + capacity * self.RECORD_SIZE)
+                os.pwrite(self._fd, self.HEADER.pack(self.MAGIC, capacity, 1), 0)
+
+        self.capacity = capacity
+        self._map = mmap.mmap(self._fd, self.RECORDS_OFFSET + capacity * self.RECORD_SIZE)
+
+    def close(self):
+        self._map.close()
+        os.close(self._fd)
+
+    def __len__(self):
+        return len(self._scan(None))
+
+    # Lock `length` lock bytes for this thread and across processes
+    @contextmanager
+    def _locked(self, thread_locks, offset: int, length: int = 1, shared: bool = False):
+        for lock in thread_locks:
+            lock.acquire()
+        try:
+            fcntl.lockf(self._fd, fcntl.LOCK_SH if shared else fcntl.LOCK_EX, length, offset)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, length, offset)
+        finally:
+            for lock in reversed(thread_locks):
+                lock.release()
+
+    def _allocator(self):
+        return self._locked([self._allocator_lock], self.ALLOCATOR_LOCK)
+
+    # Next id from this process's block, taking a new block from the header when it runs out
+    # a forked child would share its parent's block, so blocks are tied to the pid that took them
+    def _allocate_id(self):
+        with self._allocator_lock:
+            pid = os.getpid()
+            next_id, end, owner = self._block
+            if next_id >= end or owner != pid:
+                fcntl.lockf(self._fd, fcntl.LOCK_EX, 1, self.ALLOCATOR_LOCK)
+                try:
+                    next_id = self._next_id()
+                    if next_id > self.capacity:
+                        raise MemoryError("shared todo store is full")
+                    end = min(next_id + self.ID_BLOCK, self.capacity + 1)
+                    self.HEADER.pack_into(self._map, 0, self.MAGIC, self.capacity, end)
+                finally:
+                    fcntl.lockf(self._fd, fcntl.LOCK_UN, 1, self.ALLOCATOR_LOCK)
+            self._block = (next_id + 1, end, pid)
+            return next_id
+
+    def _stripe(self, todo_id: int, shared: bool = False):
+        stripe = todo_id % self.STRIPES
+        return self._locked([self._stripe_locks[stripe]], self.STRIPE_LOCKS + stripe, shared=shared)
+
+    # One shared lock over every stripe, so a full scan costs two syscalls instead of two per record
+    def _all_stripes(self):
+        return self._locked(self._stripe_locks, self.STRIPE_LOCKS, self.STRIPES, shared=True)
+
+    def _next_id(self):
+        _, _, next_id = self.HEADER.unpack_from(self._map, 0)
+        return next_id
+
+    def _offset(self, todo_id: int):
+        return self.RECORDS_OFFSET + (todo_id - 1) * self.RECORD_SIZE
+
+    def _read(self, todo_id: int):
+        if todo_id < 1 or todo_id > self.capacity:
+            return None
+        offset = self._offset(todo_id)
+        record_id, state, completed, title_len = self.RECORD.unpack_from(self._map, offset)
+        if state != self.LIVE or record_id != todo_id:
+            return None
+        start = offset + self.RECORD.size
+        return {
+            "title": self._map[start:start + title_len].decode("utf-8"),
+            "id": record_id,
+            "completed": bool(completed),
+        }
+
+    def _write(self, todo_id: int, state: int, title: str, completed: bool):
+        encoded = title.encode("utf-8")
+        offset = self._offset(todo_id)
+        start = offset + self.RECORD.size
+        self._map[start:start + len(encoded)] = encoded
+        self.RECORD.pack_into(self._map, offset, todo_id, state, 1 if completed else 0, len(encoded))
+
+    def _check_title(self, title: str):
+        if len(title.encode("utf-8")) > self.TITLE_MAX:
+            raise ValueError(f"title cannot be longer than {self.TITLE_MAX} bytes")
+
+    def _scan(self, completed: Optional[bool], after: int = 0, limit: Optional[int] = None):
+        todos = []
+        with self._all_stripes():
+            for todo_id in range(max(after, 0) + 1, min(self._next_id(), self.capacity + 1)):
+                if limit is not None and len(todos) >= limit:
+                    break
+                todo = self._read(todo_id)
+                if todo is not None and (completed is None or todo["completed"] == completed):
+                    todos.append(todo)
+        return todos
+
+    def create(self, title: str, completed: bool = False):
+        self._check_title(title)
+        todo_id = self._allocate_id()
+        with self._stripe(todo_id):
+            self._write(todo_id, self.LIVE, title, completed)
+        return {"title": title, "id": todo_id, "completed": bool(completed)}
+
+    # Todos with id > `after` in id order, at most `limit` of them
+    # the slot for an id is known, so a page starts right at the cursor
+    def list(self, completed: Optional[bool] = None, after: int = 0, limit: Optional[int] = None):
+        return self._scan(completed, after, limit)
+
+    def get(self, todo_id: int):
+        with self._stripe(todo_id, shared=True):
+            return self._read(todo_id)
+
+    def update(self, todo_id: int, title: str, completed):
+        self._check_title(title)
+        with self._stripe(todo_id):
+            if self._read(todo_id) is None:
+                return None
+            self._write(todo_id, self.LIVE, title, completed)
+            return self._read(todo_id)
+
+    def delete(self, todo_id: int):
+        with self._stripe(todo_id):
+            todo = self._read(todo_id)
+            if todo is None:
+                return False
+            self._write(todo_id, self.DELETED, "", False)
+            return True
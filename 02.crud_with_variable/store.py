@@ -0,0 +1,128 @@
+import threading
+from array import array
+from bisect import bisect_right
+from typing import Optional
+
+
+# In-memory todo store
+# - primary index: id -> todo (dicts keep insertion order, so this is also id order)
+# - secondary index: completed value -> {id: todo}
+# - sorted id array for cursor pagination, deleted ids are skipped and pruned lazily
+# routes are sync `def` handlers running on the threadpool, so every access goes through a lock
+# pass a `TodoLog` to make every mutation durable before it is acknowledged
+# stored todo dicts are never mutated, an update stores a new dict, so snapshots can read them unlocked
+class TodoStore:
+    def __init__(self, log=None):
+        self._lock = threading.RLock()
+        self._todos = {}
+        self._by_completed = {}
+        self._ids = array("q")
+        self._next_id = 1
+        self._log = log
+
+        if log is not None:
+            self._next_id, self._todos = log.load()
+            self._ids = array("q", self._todos)
+            for todo in self._todos.values():
+                self._index(todo)
+            log.open()
+
+    def close(self):
+        if self._log is not None:
+            self._log.close()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._todos)
+
+    def _index(self, todo):
+        self._by_completed.setdefault(todo["completed"], {})[todo["id"]] = todo
+
+    # Append a record to the log while holding the store lock, compacting when it grew too long
+    # compaction only rotates the log under the lock, the snapshot is written in the background
+    def _write(self, record):
+        if self._log is None:
+            return 0
+        seq = self._log.append(record)
+        if self._log.should_compact():
+            self._log.compact(self._next_id, list(self._todos.values()))
+        return seq
+
+    # Called after releasing the store lock, so writers waiting on the same fsync do not serialize
+    def _wait(self, seq):
+        if self._log is not None:
+            self._log.wait(seq)
+
+    def _unindex(self, todo):
+        bucket = self._by_completed.get(todo["completed"])
+        if bucket is not None:
+            bucket.pop(todo["id"], None)
+            if not bucket:
+                del self._by_completed[todo["completed"]]
+
+    def create(self, title: str, completed: bool = False):
+        with self._lock:
+            new_todo = {
+                "title": title,
+                "id": self._next_id,
+                "completed": completed,
+            }
+            self._todos[new_todo["id"]] = new_todo
+            self._ids.append(new_todo["id"])
+            self._index(new_todo)
+            self._next_id += 1
+            seq = self._write({"op": "create", "todo": new_todo})
+            result = dict(new_todo)
+        self._wait(seq)
+        return result
+
+    # Todos with id > `after` in id order, at most `limit` of them
+    # a page walks the id array from the cursor, so it costs O(limit) plus any skipped ids
+    def list(self, completed: Optional[bool] = None, after: int = 0, limit: Optional[int] = None):
+        with self._lock:
+            if not after and limit is None:
+                if completed is None:
+                    return [dict(todo) for todo in self._todos.values()]
+                bucket = self._by_completed.get(completed, {})
+                # todos moved between buckets by an update land at the end, so restore id order
+                return [dict(bucket[todo_id]) for todo_id in sorted(bucket)]
+
+            page = []
+            for index in range(bisect_right(self._ids, after), len(self._ids)):
+                if limit is not None and len(page) >= limit:
+                    break
+                todo = self._todos.get(self._ids[index])
+                if todo is not None and (completed is None or todo["completed"] == completed):
+                    page.append(dict(todo))
+            return page
+
+    def get(self, todo_id: int):
+        with self._lock:
+            todo = self._todos.get(todo_id)
+            return dict(todo) if todo is not None else None
+
+    def update(self, todo_id: int, title: str, completed):
+        with self._lock:
+            todo = self._todos.get(todo_id)
+            if todo is None:
+                return None
+            self._unindex(todo)
+            todo = {**todo, "title": title, "completed": completed}
+            self._todos[todo_id] = todo
+            self._index(todo)
+            seq = self._write({"op": "update", "todo": todo})
+            result = dict(todo)
+        self._wait(seq)
+        return result
+
+    def delete(self, todo_id: int):
+        with self._lock:
+            todo = self._todos.pop(todo_id, None)
+            if todo is None:
+                return False
+            self._unindex(todo)
+            if len(self._ids) > 2 * len(self._todos) + 1024:
+                self._ids = array("q", self._todos)
+            seq = self._write({"op": "delete", "id": todo_id})
+        self._wait(seq)
+        return True
@@ -0,0 +1,56 @@
+from compact_store import CompactTodoStore
+
+
+# Every listing path should agree with get() on each todo
+def assert_listings_match(store):
+    expected = [store.get(todo_id) for todo_id in range(1, store._next_id) if store.get(todo_id) is not None]
+    assert store.list() == expected
+    for completed in (True, False):
+        assert store.list(completed=completed) == [todo for todo in expected if todo["completed"] == completed]
+    pages, after = [], 0
+    while True:
+        page = store.list(after=after, limit=3)
+        if not page:
+            break
+        pages += page
+        after = page[-1]["id"]
+    assert pages == expected
+    assert store.list(completed=True, after=2, limit=4) == [
+        todo for todo in expected if todo["completed"] and todo["id"] > 2
+    ][:4]
+
+
+def create_todos(count: int):
+    store = CompactTodoStore()
+    for number in range(1, count + 1):
+        store.create(f"todo {number}", number % 2 == 1)
+    return store
+
+
+def test_listings_after_deletes():
+    store = create_todos(20)
+    for todo_id in (2, 9, 10, 17):
+        assert store.delete(todo_id)
+    assert [(todo["id"], todo["completed"]) for todo in store.list()][:3] == [(1, True), (3, True), (4, False)]
+    assert_listings_match(store)
+
+
+def test_listings_after_updates():
+    store = create_todos(20)
+    store.update(3, "todo 3, edited", False)
+    store.update(4, "todo 4 – édité", True)
+    store.delete(5)
+    assert store.get(4) == {"title": "todo 4 – édité", "id": 4, "completed": True}
+    assert_listings_match(store)
+
+
+def test_listings_after_compaction():
+    store = create_todos(20)
+    for todo_id in (1, 6, 7, 12):
+        store.delete(todo_id)
+    store.update(8, "todo 8, edited", True)
+    store._compact()
+    assert len(store._ids) == len(store) == 16
+    assert_listings_match(store)
+    store.create("todo 21")
+    assert_listings_match(store)
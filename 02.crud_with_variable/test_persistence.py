@@ -0,0 +1,123 @@
+import os
+import threading
+from persistence import TodoLog
+from store import TodoStore
+
+
+def open_store(directory, **kwargs):
+    return TodoStore(log=TodoLog(str(directory), fsync_interval=0, **kwargs))
+
+
+def test_acknowledged_writes_survive_restart(tmp_path):
+    store = open_store(tmp_path)
+    store.create("first")
+    store.create("second")
+    store.update(1, "first, edited", True)
+    store.delete(2)
+    store.close()
+
+    store = open_store(tmp_path)
+    assert store.list() == [{"title": "first, edited", "id": 1, "completed": True}]
+    assert store.create("third")["id"] == 3
+    store.close()
+
+
+def test_torn_tail_is_truncated_before_new_writes(tmp_path):
+    store = open_store(tmp_path)
+    store.create("first")
+    store.create("second")
+    store.close()
+
+    # crash halfway through appending a record
+    log_path = os.path.join(tmp_path, TodoLog.LOG_FILE)
+    intact_size = os.path.getsize(log_path)
+    with open(log_path, "ab") as f:
+        f.write(b'{"op":"create","todo":{"title":"lo')
+
+    store = open_store(tmp_path)
+    assert os.path.getsize(log_path) == intact_size
+    assert [todo["id"] for todo in store.list()] == [1, 2]
+    store.create("third")
+    store.close()
+
+    # the record written after the crash must not be hidden behind the torn one
+    store = open_store(tmp_path)
+    assert [todo["title"] for todo in store.list()] == ["first", "second", "third"]
+    assert store.create("fourth")["id"] == 4
+    store.close()
+
+
+def test_unterminated_last_record_is_dropped(tmp_path):
+    store = open_store(tmp_path)
+    store.create("first")
+    store.close()
+
+    # a complete json object whose newline never reached the disk was never acknowledged
+    log_path = os.path.join(tmp_path, TodoLog.LOG_FILE)
+    with open(log_path, "ab") as f:
+        f.write(b'{"op":"delete","id":1}')
+
+    store = open_store(tmp_path)
+    assert [todo["id"] for todo in store.list()] == [1]
+    store.create("second")
+    store.close()
+
+    store = open_store(tmp_path)
+    assert [todo["id"] for todo in store.list()] == [1, 2]
+    store.close()
+
+
+def test_compaction_writes_the_snapshot_in_the_background(tmp_path, monkeypatch):
+    release = threading.Event()
+    write_snapshot = TodoLog._write_snapshot
+    snapshotted = []
+
+    def slow_write_snapshot(self, next_id, todos):
+        release.wait(5)
+        snapshotted.extend(todos)
+        write_snapshot(self, next_id, todos)
+
+    monkeypatch.setattr(TodoLog, "_write_snapshot", slow_write_snapshot)
+    store = open_store(tmp_path, snapshot_every=5)
+    for number in range(5):
+        store.create(f"todo {number}")
+    # the fifth create rotated the log and returned while the snapshot is still pending
+    assert os.path.exists(os.path.join(tmp_path, TodoLog.OLD_LOG_FILE))
+    assert not os.path.exists(os.path.join(tmp_path, TodoLog.SNAPSHOT_FILE))
+
+    # changes made meanwhile go to the new log and leave the dicts being snapshotted alone
+    store.update(1, "edited", True)
+    store.delete(2)
+    store.create("todo 5")
+    release.set()
+    store.close()
+    assert snapshotted[0] == {"title": "todo 0", "id": 1, "completed": False}
+
+    assert not os.path.exists(os.path.join(tmp_path, TodoLog.OLD_LOG_FILE))
+    store = open_store(tmp_path)
+    assert [(todo["id"], todo["title"]) for todo in store.list()] == [
+        (1, "edited"), (3, "todo 2"), (4, "todo 3"), (5, "todo 4"), (6, "todo 5")
+    ]
+    assert store.create("todo 6")["id"] == 7
+    store.close()
+
+
+def test_interrupted_compaction_is_finished_on_start(tmp_path):
+    store = open_store(tmp_path)
+    store.create("first")
+    store.create("second")
+    store.delete(2)
+    store.close()
+
+    # crash right after the rotation, before the snapshot was written
+    os.replace(os.path.join(tmp_path, TodoLog.LOG_FILE), os.path.join(tmp_path, TodoLog.OLD_LOG_FILE))
+
+    store = open_store(tmp_path)
+    assert not os.path.exists(os.path.join(tmp_path, TodoLog.OLD_LOG_FILE))
+    assert [todo["id"] for todo in store.list()] == [1]
+    store.create("third")
+    store.close()
+
+    store = open_store(tmp_path)
+    assert [todo["title"] for todo in store.list()] == ["first", "third"]
+    store.close()
@@ -0,0 +1,97 @@
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+import httpx
+from dotenv import load_dotenv
+from pymongo import MongoClient
+from repository import DB_NAME, COLLECTION_NAME
+
+# Single-todo read throughput when most reads go to a few hot todos, with the read-through cache
+# off (TODO_CACHE_SIZE=0) and on: the app runs under uvicorn once per setting and the clients run
+# in this process, so give it cores of its own; the todos it seeds in MONGO_URI's database are
+# removed at the end; run from this folder: python benchmark_cache.py
+load_dotenv()
+MONGO_URI = os.getenv("MONGO_URI")
+TODOS = int(os.getenv("BENCH_TODOS", "10000"))
+CLIENTS = int(os.getenv("BENCH_CLIENTS", "64"))
+SECONDS = float(os.getenv("BENCH_SECONDS", "10"))
+# share of reads that go to the HOT_KEYS hot todos, the rest pick any todo
+HOT_KEYS = int(os.getenv("BENCH_HOT_KEYS", "10"))
+HOT_SHARE = float(os.getenv("BENCH_HOT_SHARE", "0.9"))
+PORT = int(os.getenv("BENCH_PORT", "8765"))
+CACHE_SIZES = (("cache off", "0"), ("cache on", "10000"))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def start_server(cache_size: str):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--log-level", "warning", "--no-access-log"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, "TODO_CACHE_SIZE": cache_size},
+    )
+    deadline = time.perf_counter() + 30
+    while time.perf_counter() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{PORT}/api/v1/cache/stats").raise_for_status()
+            return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"uvicorn with TODO_CACHE_SIZE={cache_size} did not start")
+
+
+# CLIENTS tasks reading todos back to back until SECONDS pass, returns (reads per second, latencies)
+async def run(ids: list):
+    latencies = []
+    hot = ids[:HOT_KEYS]
+    deadline = time.perf_counter() + SECONDS
+
+    async def one_client(seed):
+        rng = random.Random(seed)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=60) as client:
+            while time.perf_counter() < deadline:
+                todo_id = rng.choice(hot if rng.random() < HOT_SHARE else ids)
+                started = time.perf_counter()
+                (await client.get(f"/api/v1/todos/{todo_id}")).raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_client(seed) for seed in range(CLIENTS)))
+    return len(latencies) / (time.perf_counter() - started), latencies
+
+
+if __name__ == "__main__":
+    if not MONGO_URI:
+        raise ValueError("MONGO_URI environment variable not set")
+    collection = MongoClient(MONGO_URI)[DB_NAME][COLLECTION_NAME]
+    now = datetime.now()
+    object_ids = collection.insert_many(
+        {"title": f"bench todo {number}", "completed": False, "created_at": now, "updated_at": now, "version": 1}
+        for number in range(TODOS)
+    ).inserted_ids
+    ids = [str(object_id) for object_id in object_ids]
+    print(f"{TODOS} todos, {HOT_SHARE:.0%} of reads on {HOT_KEYS} of them, {CLIENTS} clients, {SECONDS:.0f}s per run")
+    try:
+        for name, cache_size in CACHE_SIZES:
+            server = start_server(cache_size)
+            try:
+                rate, latencies = asyncio.run(run(ids))
+                stats = httpx.get(f"http://127.0.0.1:{PORT}/api/v1/cache/stats").json()["data"]
+            finally:
+                server.terminate()
+                server.wait()
+            lookups = stats["hits"] + stats["misses"]
+            print(
+                f"{name:<10} {rate:8.0f} reads/s   p50 {percentile(latencies, 0.50) * 1000:7.2f} ms   "
+                f"p99 {percentile(latencies, 0.99) * 1000:8.2f} ms   hit rate {stats['hits'] / max(lookups, 1):4.0%}"
+            )
+    finally:
+        collection.delete_many({"_id": {"$in": object_ids}})
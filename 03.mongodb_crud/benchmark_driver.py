@@ -0,0 +1,105 @@
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+import httpx
+from dotenv import load_dotenv
+from pymongo import MongoClient
+from repository import DB_NAME, COLLECTION_NAME
+
+# Throughput and latency of the todo routes with each MONGO_DRIVER at several numbers of
+# concurrent clients: the app runs under uvicorn, once per driver with the read cache off, and the
+# clients run in this process, so give it cores of its own; the todos it seeds in MONGO_URI's
+# database are removed at the end; run from this folder: python benchmark_driver.py
+load_dotenv()
+MONGO_URI = os.getenv("MONGO_URI")
+TODOS = int(os.getenv("BENCH_TODOS", "10000"))
+CLIENTS = [int(clients) for clients in os.getenv("BENCH_CLIENTS", "50,200,1000").split(",")]
+SECONDS = float(os.getenv("BENCH_SECONDS", "10"))
+# share of requests that are updates, the rest are single-todo reads
+WRITE_SHARE = float(os.getenv("BENCH_WRITE_SHARE", "0.2"))
+PORT = int(os.getenv("BENCH_PORT", "8765"))
+DRIVERS = ("sync", "async")
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def seed(collection):
+    now = datetime.now()
+    result = collection.insert_many(
+        {"title": f"bench todo {number}", "completed": False, "created_at": now, "updated_at": now, "version": 1}
+        for number in range(TODOS)
+    )
+    return result.inserted_ids
+
+
+def start_server(driver: str):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--log-level", "warning", "--no-access-log"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, "MONGO_DRIVER": driver, "TODO_CACHE_SIZE": "0"},
+    )
+    deadline = time.perf_counter() + 30
+    while time.perf_counter() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{PORT}/api/v1/cache/stats").raise_for_status()
+            return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"uvicorn with MONGO_DRIVER={driver} did not start")
+
+
+# `clients` tasks sending requests back to back until SECONDS pass, returns (requests per second, latencies)
+# each task has a client, so a connection, of its own; one pool shared by all of them costs more
+# per request the more connections it holds
+async def run(ids: list, clients: int):
+    latencies = []
+    deadline = time.perf_counter() + SECONDS
+
+    async def one_client(seed):
+        rng = random.Random(seed)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=60) as client:
+            while time.perf_counter() < deadline:
+                todo_id = rng.choice(ids)
+                started = time.perf_counter()
+                if rng.random() < WRITE_SHARE:
+                    response = await client.put(f"/api/v1/todos/{todo_id}", json={"title": f"edited {rng.random()}"})
+                else:
+                    response = await client.get(f"/api/v1/todos/{todo_id}")
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one_client(seed) for seed in range(clients)))
+    return len(latencies) / (time.perf_counter() - started), latencies
+
+
+if __name__ == "__main__":
+    if not MONGO_URI:
+        raise ValueError("MONGO_URI environment variable not set")
+    collection = MongoClient(MONGO_URI)[DB_NAME][COLLECTION_NAME]
+    object_ids = seed(collection)
+    ids = [str(object_id) for object_id in object_ids]
+    print(f"{TODOS} todos, {WRITE_SHARE:.0%} writes, {SECONDS:.0f}s per run")
+    try:
+        for driver in DRIVERS:
+            server = start_server(driver)
+            try:
+                for clients in CLIENTS:
+                    rate, latencies = asyncio.run(run(ids, clients))
+                    print(
+                        f"{clients:>5} clients  {driver:<6} {rate:8.0f} req/s   "
+                        f"p50 {percentile(latencies, 0.50) * 1000:7.2f} ms   p99 {percentile(latencies, 0.99) * 1000:8.2f} ms"
+                    )
+            finally:
+                server.terminate()
+                server.wait()
+    finally:
+        collection.delete_many({"_id": {"$in": object_ids}})
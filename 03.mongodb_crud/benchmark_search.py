@@ -0,0 +1,57 @@
+import os
+import statistics
+import time
+from datetime import datetime
+from pymongo import MongoClient
+from dotenv import load_dotenv
+from repository import INDEXES
+from main import title_search
+
+# Title search latency against collection size: the text and prefix modes, which use the
+# title_text and title_ci indexes, next to the contains regex, which scans; every size holds the
+# same MATCHES todos whose title starts with the searched word, so only the collection grows
+# the collections go into a scratch database on MONGO_URI, dropped at the end
+# run from this folder: python benchmark_search.py
+load_dotenv()
+SIZES = [int(size) for size in os.getenv("BENCH_SIZES", "10000,100000,1000000").split(",")]
+REPEAT = int(os.getenv("BENCH_REPEAT", "20"))
+MATCHES = 20
+WORD = "needle"
+BENCH_DB = os.getenv("BENCH_DB", "todo_search_benchmark")
+
+
+def create_collection(db, size: int):
+    collection = db[f"todos_{size}"]
+    for index in INDEXES:
+        collection.create_index(**index)
+    now = datetime.now()
+    titles = [f"todo number {number}" for number in range(size - MATCHES)]
+    titles += [f"{WORD.capitalize()} in todo {number}" for number in range(MATCHES)]
+    collection.insert_many(
+        {"title": title, "completed": False, "created_at": now, "updated_at": now, "version": 1} for title in titles
+    )
+    return collection
+
+
+def median_ms(collection, search_mode: str):
+    query, options = title_search(WORD, search_mode)
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        found = list(collection.find(query, **options))
+        timings.append(time.perf_counter() - started)
+    assert len(found) == MATCHES, (search_mode, len(found))
+    return statistics.median(timings) * 1000
+
+
+if __name__ == "__main__":
+    client = MongoClient(os.getenv("MONGO_URI"))
+    print(f"{MATCHES} matching todos, median of {REPEAT} runs")
+    try:
+        for size in SIZES:
+            collection = create_collection(client[BENCH_DB], size)
+            text, prefix, contains = (median_ms(collection, mode) for mode in ("text", "prefix", "contains"))
+            print(f"{size:>8} todos  text {text:8.2f} ms   prefix {prefix:8.2f} ms   contains (regex) {contains:9.2f} ms")
+            collection.drop()
+    finally:
+        client.drop_database(BENCH_DB)
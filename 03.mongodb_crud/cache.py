@@ -0,0 +1,73 @@
+import threading
+from cachetools import TTLCache
+
+
+# TTLCache that counts what it drops: capacity evictions (least recently used first) and expiries
+class CountingTTLCache(TTLCache):
+    def __init__(self, maxsize, ttl):
+        super().__init__(maxsize, ttl)
+        self.evictions = 0
+        self.expirations = 0
+
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        self.expirations += len(expired)
+        return expired
+
+
+# Bounded TTL + LRU read-through cache for single-todo reads
+# writers call `invalidate`; a reader that started loading before an invalidation does not store
+# its (possibly stale) result, which is what the generation counter is for
+class TodoCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.enabled = maxsize > 0
+        self._cache = CountingTTLCache(max(maxsize, 1), ttl)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        if not self.enabled:
+            return None
+        with self._lock:
+            value = self._cache.get(key)
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return value
+
+    def generation(self):
+        with self._lock:
+            return self._generation
+
+    def set(self, key: str, value, generation: int):
+        if not self.enabled:
+            return
+        with self._lock:
+            if generation == self._generation:
+                self._cache[key] = value
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._generation += 1
+            self._cache.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "size": len(self._cache) if self.enabled else 0,
+                "maxsize": self._cache.maxsize if self.enabled else 0,
+                "ttl": self._cache.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self._cache.evictions,
+                "expirations": self._cache.expirations,
+            }
@@ -1,22 +1,48 @@
+import sys
+from pathlib import Path
 import os
-from fastapi import FastAPI, HTTPException, Query, Body
+import csv
+import hashlib
+import io
+import json
+from fastapi import FastAPI, HTTPException, Query, Body, Header, Response
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from contextlib import asynccontextmanager
 from typing import Optional, List
-from pymongo import MongoClient
 from bson.objectid import ObjectId
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import format_datetime
 from dotenv import load_dotenv
+from repository import create_repository, TITLE_COLLATION
+from cache import TodoCache
+# metrics are shared by the apps, from the shared/ folder at the top of the repo
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from shared.metrics import mongo_metrics
 
 load_dotenv()
-app = FastAPI()
 
 # MongoDB connection
 mongo_url = os.getenv("MONGO_URI")
 if not mongo_url:
     raise ValueError("MONGO_URI environment variable not set")
 
-client = MongoClient(mongo_url)
-db = client["fastapi-mongodb-crud"]
-todo_collection = db["todos"]
+# "sync" (PyMongo on the threadpool) or "async" (PyMongo async client on the event loop)
+MONGO_DRIVER = os.getenv("MONGO_DRIVER", "sync")
+todo_repository = create_repository(MONGO_DRIVER, mongo_url, mongo_metrics.listeners)
+
+# Read-through cache for GET /api/v1/todos/{todo_id}, TODO_CACHE_SIZE=0 disables it
+todo_cache = TodoCache(
+    maxsize=int(os.getenv("TODO_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("TODO_CACHE_TTL", "30")),
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await todo_repository.ensure_indexes()
+    yield
+    await todo_repository.close()
+
+app = FastAPI(lifespan=lifespan)
 
 # Helper function to format MongoDB documents
 def format_todo(todo):
@@ -26,11 +52,71 @@ def format_todo(todo):
         "completed": todo["completed"],
         "created_at": todo["created_at"],
         "updated_at": todo["updated_at"],
+        "version": todo.get("version", 0),
     }
 
+# Optimistic concurrency: every write bumps `version`, and a client can send the version it last
+# read as `If-Match` so the write only applies if nobody changed the todo in between
+# documents written before versioning have no field and count as version 0
+def parse_if_match(if_match: Optional[str]):
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip()
+    if value.startswith("W/"):
+        value = value[2:]
+    try:
+        return int(value.strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="If-Match must be a todo version")
+
+def version_query(object_id: ObjectId, version: Optional[int]):
+    query = {"_id": object_id}
+    if version is not None:
+        query["version"] = version if version else None
+    return query
+
+# A conditional write matched nothing: tell a missing todo apart from a lost race
+# (only costs a second round trip when the write failed)
+async def write_conflict(object_id: ObjectId, version: Optional[int]):
+    if version is not None and await todo_repository.find_one({"_id": object_id}):
+        raise HTTPException(status_code=409, detail="todo was modified by another request")
+    raise HTTPException(status_code=404, detail="todo not found")
+
+# Conditional GET: a todo's ETag is its version, a list's hashes its count and max updated_at
+def todo_etag(todo):
+    return f'"{todo.get("version", 0)}"'
+
+def list_etag(count: int, last_updated):
+    return '"' + hashlib.md5(f"{count}|{last_updated}".encode()).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str):
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag.removeprefix("W/") for tag in tags)
+
+# updated_at is written with datetime.now(), so it is local time
+def cache_headers(etag: str, last_modified: Optional[datetime] = None):
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+def not_modified(headers: dict):
+    return Response(status_code=304, headers=headers)
+
+LIST_SUMMARY = {"$group": {"_id": None, "count": {"$sum": 1}, "last_updated": {"$max": "$updated_at"}}}
+
+async def probe_list_etag(query: dict, options: dict):
+    aggregate_options = {"collation": options["collation"]} if "collation" in options else {}
+    summary = await todo_repository.aggregate([{"$match": query}, LIST_SUMMARY], **aggregate_options)
+    if not summary:
+        return list_etag(0, None)
+    return list_etag(summary[0]["count"], summary[0]["last_updated"])
+
 # Create a todo
 @app.post("/api/v1/todos")
-def create_todo(todo=Body(...)):
+async def create_todo(todo=Body(...)):
     if not todo.get("title", "").strip():
         raise HTTPException(status_code=400, detail="title is required and cannot be empty")
     new_todo = {
@@ -38,70 +124,180 @@ def create_todo(todo=Body(...)):
         "completed": todo.get("completed", False),
         "created_at": datetime.now(),
         "updated_at": datetime.now(),
+        "version": 1,
     }
-    result = todo_collection.insert_one(new_todo)
-    new_todo["_id"] = str(result.inserted_id)
+    inserted_id = await todo_repository.insert(new_todo)
+    new_todo["_id"] = str(inserted_id)
     return {"message": "todo created", "data": new_todo}
 
+# Title search modes:
+# - contains: unanchored case-insensitive regex, scans every document
+# - text: $text search on the title_text index, best matches first
+# - prefix: case-insensitive "starts with" as a range on the title_ci collation index
+def title_search(title: str, search_mode: str):
+    if search_mode == "text":
+        return (
+            {"$text": {"$search": title}},
+            {
+                "projection": {"score": {"$meta": "textScore"}},
+                "sort": [("score", {"$meta": "textScore"})],
+            },
+        )
+    if search_mode == "prefix":
+        # U+FFFF sorts after every other character under the collation, closing the range
+        return {"title": {"$gte": title, "$lt": title + "\uffff"}}, {"collation": TITLE_COLLATION}
+    return {"title": {"$regex": title, "$options": "i"}}, {}
+
 # Get all todos with optional filtering
 @app.get("/api/v1/todos")
-def get_todos(
+async def get_todos(
+    response: Response,
     completed: Optional[bool] = Query(None),
     title: Optional[str] = Query(None),
+    search_mode: str = Query("contains", pattern="^(contains|text|prefix)$"),
+    if_none_match: Optional[str] = Header(None),
 ):
     query = {}
+    options = {}
     if completed is not None:
         query["completed"] = completed
     if title:
-        query["title"] = {"$regex": title, "$options": "i"}
-    todos = todo_collection.find(query)
-    print("todos")
-    print(todos)
+        title_query, options = title_search(title, search_mode)
+        query.update(title_query)
+    if if_none_match:
+        etag = await probe_list_etag(query, options)
+        if etag_matches(if_none_match, etag):
+            return not_modified(cache_headers(etag))
+    todos = await todo_repository.find(query, **options)
+    # same values the probe computes, taken from the fetched todos instead of a second query
+    last_updated = max((todo["updated_at"] for todo in todos), default=None)
+    response.headers.update(cache_headers(list_etag(len(todos), last_updated)))
     formatted_todos = [format_todo(todo) for todo in todos]
     return {"message": "todos fetched", "data": formatted_todos}
 
+# Export todos as NDJSON or CSV, streamed in batches so memory stays flat for any collection size
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FIELDS = ["_id", "title", "completed", "created_at", "updated_at", "version"]
+
+def export_row(todo):
+    todo = format_todo(todo)
+    todo["created_at"] = todo["created_at"].isoformat()
+    todo["updated_at"] = todo["updated_at"].isoformat()
+    return todo
+
+async def export_ndjson(batches):
+    async for todos in batches:
+        yield "".join(json.dumps(export_row(todo)) + "\n" for todo in todos)
+
+async def export_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    yield buffer.getvalue()
+    async for todos in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(export_row(todo) for todo in todos)
+        yield buffer.getvalue()
+
+# Export route, ahead of /{todo_id}
+@app.get("/api/v1/todos/export")
+async def export_todos(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    completed: Optional[bool] = Query(None),
+    title: Optional[str] = Query(None),
+):
+    query = {}
+    if completed is not None:
+        query["completed"] = completed
+    if title:
+        query["title"] = {"$regex": title, "$options": "i"}
+    # the driver fetches EXPORT_BATCH_SIZE documents per getMore instead of buffering the result
+    batches = todo_repository.stream(query, EXPORT_BATCH_SIZE)
+    if format == "csv":
+        return StreamingResponse(
+            export_csv(batches),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=todos.csv"},
+        )
+    return StreamingResponse(
+        export_ndjson(batches),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=todos.ndjson"},
+    )
+
 # Get a single todo by ID
 @app.get("/api/v1/todos/{todo_id}")
-def get_todo(todo_id: str):
+async def get_todo(todo_id: str, response: Response, if_none_match: Optional[str] = Header(None)):
     try:
-        todo = todo_collection.find_one({"_id": ObjectId(todo_id)})
+        object_id = ObjectId(todo_id)
     except:
         raise HTTPException(status_code=400, detail="invalid todo ID")
-    if not todo:
-        raise HTTPException(status_code=404, detail="todo not found")
-    return {"message": "todo fetched", "data": format_todo(todo)}
+    key = str(object_id)
+    data = todo_cache.get(key)
+    if data is None:
+        generation = todo_cache.generation()
+        todo = await todo_repository.find_one({"_id": object_id})
+        if not todo:
+            raise HTTPException(status_code=404, detail="todo not found")
+        data = format_todo(todo)
+        todo_cache.set(key, data, generation)
+    headers = cache_headers(todo_etag(data), data["updated_at"])
+    if etag_matches(if_none_match, headers["ETag"]):
+        return not_modified(headers)
+    response.headers.update(headers)
+    return {"message": "todo fetched", "data": data}
 
 # Update a todo by ID
+# single find_one_and_update round trip, returning the document as stored after the update
 @app.put("/api/v1/todos/{todo_id}")
-def update_todo(todo_id: str, updated_todo=Body(...)):
+async def update_todo(todo_id: str, updated_todo=Body(...), if_match: Optional[str] = Header(None)):
     try:
-        todo = todo_collection.find_one({"_id": ObjectId(todo_id)})
+        object_id = ObjectId(todo_id)
     except:
         raise HTTPException(status_code=400, detail="invalid todo ID")
-    if not todo:
-        raise HTTPException(status_code=404, detail="todo not found")
     if not updated_todo.get("title", "").strip():
         raise HTTPException(status_code=400, detail="title is required and cannot be empty")
+    version = parse_if_match(if_match)
     updated_data = {
         "title": updated_todo["title"],
-        "completed": updated_todo.get("completed", todo["completed"]),
         "updated_at": datetime.now(),
     }
-    todo_collection.update_one({"_id": ObjectId(todo_id)}, {"$set": updated_data})
-    updated_data["_id"] = todo_id
-    return {"message": "todo updated", "data": updated_data}
+    if "completed" in updated_todo:
+        updated_data["completed"] = updated_todo["completed"]
+    todo = await todo_repository.find_one_and_update(
+        version_query(object_id, version),
+        {"$set": updated_data, "$inc": {"version": 1}},
+    )
+    todo_cache.invalidate(str(object_id))
+    if not todo:
+        await write_conflict(object_id, version)
+    return {"message": "todo updated", "data": format_todo(todo)}
 
 # Delete a todo by ID
 @app.delete("/api/v1/todos/{todo_id}")
-def delete_todo(todo_id: str):
+async def delete_todo(todo_id: str, if_match: Optional[str] = Header(None)):
     try:
-        result = todo_collection.delete_one({"_id": ObjectId(todo_id)})
+        object_id = ObjectId(todo_id)
     except:
         raise HTTPException(status_code=400, detail="invalid todo ID")
-    if result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="todo not found")
+    version = parse_if_match(if_match)
+    todo = await todo_repository.find_one_and_delete(version_query(object_id, version))
+    todo_cache.invalidate(str(object_id))
+    if not todo:
+        await write_conflict(object_id, version)
     return {"message": "todo deleted"}
 
+# Cache counters
+@app.get("/api/v1/cache/stats")
+async def cache_stats():
+    return {"message": "cache stats fetched", "data": todo_cache.stats()}
+
+# Driver command latency and connection pool metrics, in the Prometheus text format
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(mongo_metrics.render(), media_type=mongo_metrics.CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,126 @@
+from pymongo import MongoClient, ReturnDocument, TEXT
+from pymongo.collation import Collation
+from pymongo.asynchronous.mongo_client import AsyncMongoClient
+from starlette.concurrency import run_in_threadpool
+
+DB_NAME = "fastapi-mongodb-crud"
+COLLECTION_NAME = "todos"
+
+# Case-insensitive comparison (strength 2 ignores case but not accents), shared by the
+# title index and prefix queries; a query only uses the index when the collations match
+TITLE_COLLATION = Collation(locale="en", strength=2)
+
+INDEXES = [
+    {"keys": [("title", TEXT)], "name": "title_text"},
+    {"keys": [("title", 1)], "name": "title_ci", "collation": TITLE_COLLATION},
+]
+
+
+# Todo data access, picked at startup with MONGO_DRIVER
+# both repositories expose the same coroutine methods so the routes are written once:
+# - SyncTodoRepository runs the blocking PyMongo client on the threadpool (the original behaviour)
+# - AsyncTodoRepository uses the native PyMongo async client, so waiting on Mongo holds no thread
+class SyncTodoRepository:
+    def __init__(self, mongo_url: str, event_listeners=()):
+        self.client = MongoClient(mongo_url, event_listeners=event_listeners)
+        self.collection = self.client[DB_NAME][COLLECTION_NAME]
+
+    async def close(self):
+        self.client.close()
+
+    async def ensure_indexes(self):
+        for index in INDEXES:
+            await run_in_threadpool(lambda: self.collection.create_index(**index))
+
+    async def insert(self, todo: dict):
+        result = await run_in_threadpool(self.collection.insert_one, todo)
+        return result.inserted_id
+
+    async def find(self, query: dict, **options):
+        return await run_in_threadpool(lambda: list(self.collection.find(query, **options)))
+
+    async def find_one(self, query: dict):
+        return await run_in_threadpool(self.collection.find_one, query)
+
+    async def aggregate(self, pipeline: list, **options):
+        return await run_in_threadpool(lambda: list(self.collection.aggregate(pipeline, **options)))
+
+    # Apply `update` to the matching document and return it as it is after the update, or None
+    async def find_one_and_update(self, query: dict, update: dict):
+        return await run_in_threadpool(
+            lambda: self.collection.find_one_and_update(query, update, return_document=ReturnDocument.AFTER)
+        )
+
+    async def find_one_and_delete(self, query: dict):
+        return await run_in_threadpool(self.collection.find_one_and_delete, query)
+
+    # Yield lists of up to `batch_size` documents, one getMore per list
+    async def stream(self, query: dict, batch_size: int):
+        cursor = self.collection.find(query).batch_size(batch_size)
+
+        def next_batch():
+            return [todo for _, todo in zip(range(batch_size), cursor)]
+
+        try:
+            while True:
+                batch = await run_in_threadpool(next_batch)
+                if not batch:
+                    break
+                yield batch
+        finally:
+            cursor.close()
+
+
+class AsyncTodoRepository:
+    def __init__(self, mongo_url: str, event_listeners=()):
+        self.client = AsyncMongoClient(mongo_url, event_listeners=event_listeners)
+        self.collection = self.client[DB_NAME][COLLECTION_NAME]
+
+    async def close(self):
+        await self.client.close()
+
+    async def ensure_indexes(self):
+        for index in INDEXES:
+            await self.collection.create_index(**index)
+
+    async def insert(self, todo: dict):
+        result = await self.collection.insert_one(todo)
+        return result.inserted_id
+
+    async def find(self, query: dict, **options):
+        return await self.collection.find(query, **options).to_list(None)
+
+    async def find_one(self, query: dict):
+        return await self.collection.find_one(query)
+
+    async def aggregate(self, pipeline: list, **options):
+        cursor = await self.collection.aggregate(pipeline, **options)
+        return await cursor.to_list(None)
+
+    async def find_one_and_update(self, query: dict, update: dict):
+        return await self.collection.find_one_and_update(query, update, return_document=ReturnDocument.AFTER)
+
+    async def find_one_and_delete(self, query: dict):
+        return await self.collection.find_one_and_delete(query)
+
+    async def stream(self, query: dict, batch_size: int):
+        cursor = self.collection.find(query).batch_size(batch_size)
+        try:
+            batch = []
+            async for todo in cursor:
+                batch.append(todo)
+                if len(batch) == batch_size:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        finally:
+            await cursor.close()
+
+
+def create_repository(driver: str, mongo_url: str, event_listeners=()):
+    if driver == "sync":
+        return SyncTodoRepository(mongo_url, event_listeners)
+    if driver == "async":
+        return AsyncTodoRepository(mongo_url, event_listeners)
+    raise ValueError(f"unknown MONGO_DRIVER: {driver}")
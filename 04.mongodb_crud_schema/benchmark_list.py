@@ -0,0 +1,76 @@
+import cProfile
+import os
+import pstats
+import statistics
+import time
+from datetime import datetime, timedelta
+from mongoengine import connect, disconnect
+import main
+
+# List route latency at a large collection: hydrating Todo documents and calling to_dict(), the
+# way the route used to build its response, against the lean as_pymongo() path it uses now;
+# BENCH_PROFILE=1 also prints where each path spends its time
+# the todos go into a scratch database on MONGO_URI, dropped at the end
+# run from this folder: python benchmark_list.py
+TODOS = int(os.getenv("BENCH_TODOS", "100000"))
+REPEAT = int(os.getenv("BENCH_REPEAT", "5"))
+PROFILE = os.getenv("BENCH_PROFILE", "0") == "1"
+BENCH_DB = os.getenv("BENCH_DB", "todo_list_benchmark")
+
+
+def seed():
+    now = datetime.utcnow()
+    main.Todo._get_collection().insert_many(
+        {
+            "title": f"todo number {number}",
+            "completed": number % 3 == 0,
+            "created_at": now - timedelta(seconds=number),
+            "updated_at": now,
+        }
+        for number in range(TODOS)
+    )
+    main.Todo.ensure_indexes()
+
+
+def hydrated(completed=None):
+    return [todo.to_dict() for todo in main.list_todos(completed=completed)]
+
+
+def lean(completed=None):
+    return [main.raw_to_dict(doc) for doc in main.lean(main.list_todos(completed=completed))]
+
+
+def median_ms(function, **kwargs):
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        function(**kwargs)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def profile(function):
+    profiler = cProfile.Profile()
+    profiler.runcall(function)
+    print(f"\n{function.__name__}, top functions by own time:")
+    pstats.Stats(profiler).sort_stats("tottime").print_stats(8)
+
+
+if __name__ == "__main__":
+    # main.py connected to the app's database on import
+    disconnect()
+    connect(BENCH_DB, host=main.mongo_url)
+    try:
+        seed()
+        assert hydrated() == lean()
+        print(f"{TODOS} todos, median of {REPEAT} runs")
+        for label, completed in (("all", None), ("completed", True)):
+            slow = median_ms(hydrated, completed=completed)
+            fast = median_ms(lean, completed=completed)
+            print(f"{label:<10} to_dict() {slow:9.1f} ms   as_pymongo() {fast:9.1f} ms   {slow / fast:5.1f}x")
+        if PROFILE:
+            profile(hydrated)
+            profile(lean)
+    finally:
+        main.Todo._get_db().client.drop_database(BENCH_DB)
+        disconnect()
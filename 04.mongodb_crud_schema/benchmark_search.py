@@ -0,0 +1,53 @@
+import os
+import statistics
+import time
+from datetime import datetime
+from mongoengine import connect, disconnect
+import main
+
+# Title search latency against collection size, through the list route's queryset: the text and
+# prefix modes, which use the title_text and title_ci indexes, next to the contains regex, which
+# scans; every size holds the same MATCHES todos whose title starts with the searched word, so only
+# the collection grows; the todos go into a scratch database on MONGO_URI, dropped at the end
+# run from this folder: python benchmark_search.py
+SIZES = [int(size) for size in os.getenv("BENCH_SIZES", "10000,100000,1000000").split(",")]
+REPEAT = int(os.getenv("BENCH_REPEAT", "20"))
+MATCHES = 20
+WORD = "needle"
+BENCH_DB = os.getenv("BENCH_DB", "todo_search_benchmark")
+
+
+def create_todos(size: int):
+    main.Todo.drop_collection()
+    main.Todo.ensure_indexes()
+    now = datetime.utcnow()
+    titles = [f"todo number {number}" for number in range(size - MATCHES)]
+    titles += [f"{WORD.capitalize()} in todo {number}" for number in range(MATCHES)]
+    main.Todo._get_collection().insert_many(
+        {"title": title, "completed": False, "created_at": now, "updated_at": now} for title in titles
+    )
+
+
+def median_ms(search_mode: str):
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        found = [main.raw_to_dict(doc) for doc in main.lean(main.list_todos(title=WORD, search_mode=search_mode))]
+        timings.append(time.perf_counter() - started)
+    assert len(found) == MATCHES, (search_mode, len(found))
+    return statistics.median(timings) * 1000
+
+
+if __name__ == "__main__":
+    # main.py connected to the app's database on import
+    disconnect()
+    connect(BENCH_DB, host=main.mongo_url)
+    print(f"{MATCHES} matching todos, median of {REPEAT} runs")
+    try:
+        for size in SIZES:
+            create_todos(size)
+            text, prefix, contains = (median_ms(mode) for mode in ("text", "prefix", "contains"))
+            print(f"{size:>8} todos  text {text:8.2f} ms   prefix {prefix:8.2f} ms   contains (regex) {contains:9.2f} ms")
+    finally:
+        main.Todo._get_db().client.drop_database(BENCH_DB)
+        disconnect()
@@ -1,22 +1,46 @@
+import sys
+from pathlib import Path
 import os
-from fastapi import FastAPI, HTTPException, Query, Body
+import csv
+import hashlib
+import io
+import json
+from fastapi import FastAPI, HTTPException, Query, Body, Header, Response
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from contextlib import asynccontextmanager
 from typing import Optional, List
 from mongoengine import connect, Document, StringField, BooleanField, DateTimeField
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
 from dotenv import load_dotenv
+from cache import TodoCache, TTLValue
+# metrics are shared by the apps, from the shared/ folder at the top of the repo
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from shared.metrics import mongo_metrics
 
 load_dotenv()
 
+# Startup: create declared indexes, then check the route queries actually use them
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    Todo.ensure_indexes()
+    check_query_plans()
+    yield
+
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # MongoDB connection setup using MongoEngine
 mongo_url = os.getenv("MONGO_URI")
 if not mongo_url:
     raise ValueError("MONGO_URI environment variable not set")
 
-connect("todo_db_python_schema_fastapi", host=mongo_url)
+connect("todo_db_python_schema_fastapi", host=mongo_url, event_listeners=mongo_metrics.listeners)
+
+# Case-insensitive comparison (strength 2 ignores case but not accents), shared by the
+# title index and prefix queries; a query only uses the index when the collations match
+TITLE_COLLATION = {"locale": "en", "strength": 2}
 
 # Define the Todo schema using MongoEngine
 class Todo(Document):
@@ -25,6 +49,16 @@ class Todo(Document):
     created_at = DateTimeField(default=datetime.utcnow)
     updated_at = DateTimeField(default=datetime.utcnow)
 
+    meta = {
+        "indexes": [
+            {"fields": ["$title"], "name": "title_text"},
+            {"fields": ["title"], "name": "title_ci", "collation": TITLE_COLLATION},
+            # newest-first listing, with and without the completed filter
+            {"fields": ["completed", "-created_at"], "name": "completed_created_at"},
+            {"fields": ["-created_at"], "name": "created_at"},
+        ]
+    }
+
     def to_dict(self):
         return {
             "id": str(self.id),
@@ -34,6 +68,32 @@ class Todo(Document):
             "updated_at": self.updated_at,
         }
 
+# Read-through cache for GET /api/v1/todos/{todo_id}, TODO_CACHE_SIZE=0 disables it
+# keys are lowercased ids so differently-cased hex in the URL hits the same entry
+todo_cache = TodoCache(
+    maxsize=int(os.getenv("TODO_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("TODO_CACHE_TTL", "30")),
+)
+
+# Lean read path: list routes fetch raw documents with as_pymongo() and only the response fields,
+# skipping Document hydration (field descriptors, change tracking, validation); writes still go
+# through the Todo model
+READ_FIELDS = ("id", "title", "completed", "created_at", "updated_at")
+READ_BATCH_SIZE = 1000
+
+def lean(todos):
+    return todos.only(*READ_FIELDS).batch_size(READ_BATCH_SIZE).as_pymongo()
+
+# Same shape as Todo.to_dict, built from a raw document
+def raw_to_dict(doc):
+    return {
+        "id": str(doc["_id"]),
+        "title": doc.get("title"),
+        "completed": doc.get("completed", False),
+        "created_at": doc.get("created_at"),
+        "updated_at": doc.get("updated_at"),
+    }
+
 # Pydantic models for request validation
 class TodoCreate(BaseModel):
     title: str
@@ -45,20 +105,230 @@ class TodoUpdate(BaseModel):
 
 # Routes
 
-@app.get("/api/v1/todos", response_model=List[dict])
-def get_todos(title: Optional[str] = Query(None), completed: Optional[bool] = Query(None)):
+# Title search modes:
+# - contains: case-insensitive substring match, scans every document
+# - text: $text search on the title_text index, best matches first
+# - prefix: case-insensitive "starts with" as a range on the title_ci collation index
+def search_todos(todos, title: str, search_mode: str):
+    if search_mode == "text":
+        return todos.search_text(title).order_by("$text_score")
+    if search_mode == "prefix":
+        # U+FFFF sorts after every other character under the collation, closing the range
+        return todos.filter(title__gte=title, title__lt=title + "\uffff").collation(TITLE_COLLATION)
+    return todos.filter(title__icontains=title)  # Case insensitive search
+
+# Queryset for the list and export routes, newest first unless ranked by text score
+def list_todos(title: Optional[str] = None, completed: Optional[bool] = None, search_mode: str = "contains"):
     filters = {}
-    if title:
-        filters["title__icontains"] = title  # Case insensitive search
     if completed is not None:
         filters["completed"] = completed
 
     todos = Todo.objects(**filters)
+    if title:
+        todos = search_todos(todos, title, search_mode)
+    if not title or search_mode != "text":
+        todos = todos.order_by("-created_at")
+    return todos
+
+# Query plan check: explain() the queries the routes issue and flag any whose winning plan
+# is a collection scan. QUERY_PLAN_CHECK=warn (default) prints them, =fail raises so a CI
+# job that starts the app catches index regressions, =off skips the check.
+# "contains" title search is an unanchored regex and scans by design, so it is not checked.
+QUERY_PLAN_CHECK = os.getenv("QUERY_PLAN_CHECK", "warn")
+
+def route_queries():
+    return {
+        "list": list_todos(),
+        "list completed": list_todos(completed=True),
+        "list pending": list_todos(completed=False),
+        "prefix search": list_todos(title="a", search_mode="prefix"),
+        "text search": list_todos(title="a", search_mode="text"),
+        "get by id": Todo.objects(id="0" * 24),
+    }
+
+def plan_stages(plan):
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from plan_stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from plan_stages(value)
+
+def collection_scans():
+    scans = []
+    for name, todos in route_queries().items():
+        winning_plan = todos.explain()["queryPlanner"]["winningPlan"]
+        if "COLLSCAN" in plan_stages(winning_plan):
+            scans.append(name)
+    return scans
+
+def check_query_plans():
+    if QUERY_PLAN_CHECK == "off":
+        return
+    scans = collection_scans()
+    if not scans:
+        return
+    message = f"queries without an index (COLLSCAN): {', '.join(scans)}"
+    if QUERY_PLAN_CHECK == "fail":
+        raise RuntimeError(message)
+    print(f"warning: {message}")
+
+# Conditional GET: ETags hash a todo's id and updated_at, or a list's count and max updated_at
+def make_etag(*parts):
+    return '"' + hashlib.md5("|".join(str(part) for part in parts).encode()).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str):
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag.removeprefix("W/") for tag in tags)
+
+# updated_at is written with datetime.utcnow(), so it is naive UTC
+def cache_headers(etag: str, last_modified: Optional[datetime] = None):
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+    return headers
+
+def not_modified(headers: dict):
+    return Response(status_code=304, headers=headers)
+
+LIST_SUMMARY = {"$group": {"_id": None, "count": {"$sum": 1}, "last_updated": {"$max": "$updated_at"}}}
+
+def probe_list_etag(title: Optional[str], completed: Optional[bool], search_mode: str):
+    # ordering does not change the summary, so the probe drops the sort stage
+    todos = list_todos(title, completed, search_mode).order_by()
+    options = {"collation": TITLE_COLLATION} if title and search_mode == "prefix" else {}
+    summary = list(todos.aggregate([LIST_SUMMARY], **options))
+    if not summary:
+        return make_etag(0, None)
+    return make_etag(summary[0]["count"], summary[0]["last_updated"])
+
+@app.get("/api/v1/todos", response_model=dict)
+def get_todos(
+    response: Response,
+    title: Optional[str] = Query(None),
+    completed: Optional[bool] = Query(None),
+    search_mode: str = Query("contains", pattern="^(contains|text|prefix)$"),
+    if_none_match: Optional[str] = Header(None)
+):
+    if if_none_match:
+        etag = probe_list_etag(title, completed, search_mode)
+        if etag_matches(if_none_match, etag):
+            return not_modified(cache_headers(etag))
+    todos = [raw_to_dict(doc) for doc in lean(list_todos(title, completed, search_mode))]
+    # same values the probe computes, taken from the fetched todos instead of a second query
+    last_updated = max((todo["updated_at"] for todo in todos), default=None)
+    response.headers.update(cache_headers(make_etag(len(todos), last_updated)))
     return {
         "message": "todos fetched",
-        "data": [todo.to_dict() for todo in todos]
+        "data": todos
     }
 
+# Export todos as NDJSON or CSV, streamed in batches so memory stays flat for any collection size
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FIELDS = ["id", "title", "completed", "created_at", "updated_at"]
+
+def export_row(doc):
+    data = raw_to_dict(doc)
+    data["created_at"] = data["created_at"].isoformat()
+    data["updated_at"] = data["updated_at"].isoformat()
+    return data
+
+def export_batches(todos):
+    batch = []
+    for todo in todos:
+        batch.append(export_row(todo))
+        if len(batch) == EXPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def export_ndjson(batches):
+    for todos in batches:
+        yield "".join(json.dumps(todo) + "\n" for todo in todos)
+
+def export_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    yield buffer.getvalue()
+    for todos in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(todos)
+        yield buffer.getvalue()
+
+# Dashboard statistics: totals, counts by completed and todos created per day over the last
+# STATS_DAYS days, from one $facet aggregation (one round trip, one pass over the collection)
+# results are shared for STATS_CACHE_TTL seconds, so many dashboards polling at once cost one query
+STATS_DAYS = int(os.getenv("STATS_DAYS", "30"))
+
+def stats_pipeline(since: datetime):
+    return [
+        {"$project": {"_id": 0, "completed": 1, "created_at": 1}},
+        {"$facet": {
+            "total": [{"$count": "count"}],
+            "by_completed": [{"$group": {"_id": "$completed", "count": {"$sum": 1}}}],
+            "created_per_day": [
+                {"$match": {"created_at": {"$gte": since}}},
+                {"$group": {
+                    "_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$created_at"}},
+                    "count": {"$sum": 1},
+                }},
+                {"$sort": {"_id": 1}},
+            ],
+        }},
+    ]
+
+def load_stats():
+    now = datetime.utcnow()
+    since = datetime(now.year, now.month, now.day) - timedelta(days=STATS_DAYS - 1)
+    facets = next(Todo.objects.aggregate(stats_pipeline(since)))
+    by_completed = {group["_id"]: group["count"] for group in facets["by_completed"]}
+    return {
+        "total": facets["total"][0]["count"] if facets["total"] else 0,
+        "completed": by_completed.get(True, 0),
+        # todos saved without the field default to not completed
+        "pending": by_completed.get(False, 0) + by_completed.get(None, 0),
+        "created_per_day": [
+            {"date": day["_id"], "count": day["count"]} for day in facets["created_per_day"]
+        ],
+        "generated_at": now,
+    }
+
+todo_stats = TTLValue(load_stats, ttl=float(os.getenv("STATS_CACHE_TTL", "5")))
+
+# Stats route, ahead of /{todo_id}
+@app.get("/api/v1/todos/stats", response_model=dict)
+def get_todo_stats():
+    return {"message": "todo stats fetched", "data": todo_stats.get()}
+
+# Export route, ahead of /{todo_id}
+@app.get("/api/v1/todos/export")
+def export_todos(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    title: Optional[str] = Query(None),
+    completed: Optional[bool] = Query(None)
+):
+    # no_cache stops the queryset from keeping every document it has yielded
+    todos = lean(list_todos(title, completed).no_cache()).batch_size(EXPORT_BATCH_SIZE)
+    batches = export_batches(todos)
+    if format == "csv":
+        return StreamingResponse(
+            export_csv(batches),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=todos.csv"},
+        )
+    return StreamingResponse(
+        export_ndjson(batches),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=todos.ndjson"},
+    )
+
 @app.post("/api/v1/todos", response_model=dict, status_code=201)
 def create_todo(todo: TodoCreate):
     new_todo = Todo(
@@ -71,12 +341,22 @@ def create_todo(todo: TodoCreate):
     return {"message": "todo created successfully", "data": new_todo.to_dict()}
 
 @app.get("/api/v1/todos/{todo_id}", response_model=dict)
-def get_todo(todo_id: str):
-    try:
-        todo = Todo.objects.get(id=todo_id)
-        return {"message": "todo fetched successfully", "data": todo.to_dict()}
-    except Todo.DoesNotExist:
-        raise HTTPException(status_code=404, detail="todo not found")
+def get_todo(todo_id: str, response: Response, if_none_match: Optional[str] = Header(None)):
+    key = todo_id.lower()
+    data = todo_cache.get(key)
+    if data is None:
+        generation = todo_cache.generation()
+        try:
+            todo = Todo.objects.get(id=todo_id)
+        except Todo.DoesNotExist:
+            raise HTTPException(status_code=404, detail="todo not found")
+        data = todo.to_dict()
+        todo_cache.set(key, data, generation)
+    headers = cache_headers(make_etag(data["id"], data["updated_at"]), data["updated_at"])
+    if etag_matches(if_none_match, headers["ETag"]):
+        return not_modified(headers)
+    response.headers.update(headers)
+    return {"message": "todo fetched successfully", "data": data}
 
 @app.put("/api/v1/todos/{todo_id}", response_model=dict)
 def update_todo(todo_id: str, updated_todo: TodoUpdate):
@@ -92,6 +372,7 @@ def update_todo(todo_id: str, updated_todo: TodoUpdate):
 
     todo.updated_at = datetime.utcnow()
     todo.save()
+    todo_cache.invalidate(todo_id.lower())
     return {"message": "todo updated successfully", "data": todo.to_dict()}
 
 @app.delete("/api/v1/todos/{todo_id}", response_model=dict)
@@ -99,10 +380,21 @@ def delete_todo(todo_id: str):
     try:
         todo = Todo.objects.get(id=todo_id)
         todo.delete()
+        todo_cache.invalidate(todo_id.lower())
         return {"message": "todo deleted successfully"}
     except Todo.DoesNotExist:
         raise HTTPException(status_code=404, detail="todo not found")
 
+# Cache counters
+@app.get("/api/v1/cache/stats", response_model=dict)
+def cache_stats():
+    return {"message": "cache stats fetched", "data": todo_cache.stats()}
+
+# Driver command latency and connection pool metrics, in the Prometheus text format
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(mongo_metrics.render(), media_type=mongo_metrics.CONTENT_TYPE)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,124 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+from database import ConnectionPool, MIGRATIONS
+
+# Mixed read/write throughput with concurrent clients: a connection opened per query with the
+# default pragmas (how query_db used to work) against the per-thread pool, whose page cache size
+# is also varied; run from this folder: python benchmark_pool.py
+TODOS = int(os.getenv("BENCH_TODOS", "100000"))
+CLIENTS = [int(clients) for clients in os.getenv("BENCH_CLIENTS", "8,40").split(",")]
+SECONDS = float(os.getenv("BENCH_SECONDS", "5"))
+# share of operations that are writes, the rest are a single-todo read or a page of 20
+WRITE_SHARE = float(os.getenv("BENCH_WRITE_SHARE", "0.2"))
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def create_database(path: str):
+    conn = sqlite3.connect(path)
+    for migration in MIGRATIONS:
+        migration(conn)
+    now = datetime.now().isoformat()
+    with conn:
+        conn.executemany(
+            "INSERT INTO todos (title, completed, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            ((f"todo number {number}", number % 3 == 0, now, now) for number in range(TODOS)),
+        )
+    conn.close()
+
+
+# A query_db-shaped function per variant
+def connect_per_query(path: str):
+    def query(sql: str, args: tuple = ()):
+        conn = sqlite3.connect(path, timeout=5)
+        try:
+            with conn:
+                return conn.execute(sql, args).fetchall()
+        finally:
+            conn.close()
+    return query, lambda: None
+
+
+def pooled(path: str, cache_size: int):
+    class Pool(ConnectionPool):
+        PRAGMAS = tuple(
+            f"PRAGMA cache_size = {cache_size}" if pragma.startswith("PRAGMA cache_size") else pragma
+            for pragma in ConnectionPool.PRAGMAS
+        )
+
+    pool = Pool(path)
+
+    def query(sql: str, args: tuple = ()):
+        conn = pool.connection()
+        with conn:
+            return conn.execute(sql, args).fetchall()
+    return query, pool.close_all
+
+
+def one_operation(query, rng):
+    todo_id = rng.randint(1, TODOS)
+    if rng.random() < WRITE_SHARE:
+        query(
+            "UPDATE todos SET title = ?, updated_at = ? WHERE id = ?",
+            (f"edited {rng.random()}", datetime.now().isoformat(), todo_id),
+        )
+    elif rng.random() < 0.5:
+        query("SELECT * FROM todos WHERE id = ?", (todo_id,))
+    else:
+        query("SELECT * FROM todos WHERE id > ? ORDER BY id LIMIT 20", (todo_id,))
+
+
+def run(query, clients: int):
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + SECONDS
+
+    def client(seed):
+        rng = random.Random(seed)
+        own = []
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            one_operation(query, rng)
+            own.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(own)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(seed,)) for seed in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return len(latencies) / (time.perf_counter() - started), latencies
+
+
+if __name__ == "__main__":
+    variants = (
+        ("connect per query", lambda path: connect_per_query(path)),
+        ("pool, 64 MiB cache", lambda path: pooled(path, -65536)),
+        ("pool, 8 MiB cache", lambda path: pooled(path, -8192)),
+    )
+    print(f"{TODOS} todos, {WRITE_SHARE:.0%} writes, {SECONDS:.0f}s per run")
+    for clients in CLIENTS:
+        for name, make in variants:
+            directory = tempfile.mkdtemp(prefix="sqlite-bench-")
+            path = os.path.join(directory, "todos.db")
+            create_database(path)
+            query, close = make(path)
+            rate, latencies = run(query, clients)
+            close()
+            print(
+                f"{clients:>4} clients  {name:<20} {rate:8.0f} ops/s   "
+                f"p50 {percentile(latencies, 0.50) * 1000:6.2f} ms   p99 {percentile(latencies, 0.99) * 1000:7.2f} ms"
+            )
+            for file_name in os.listdir(directory):
+                os.remove(os.path.join(directory, file_name))
+            os.rmdir(directory)
@@ -0,0 +1,78 @@
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Title search latency against table size: the FTS5 search the list route runs for ?search=
+# next to the LIKE '%word%' scan that ?title= still does
+# run from this folder: python benchmark_search.py
+SIZES = [int(size) for size in os.getenv("BENCH_SIZES", "10000,100000,1000000").split(",")]
+REPEAT = int(os.getenv("BENCH_REPEAT", "20"))
+LIMIT = 20
+# titles are four words drawn from this many, so one word is in about 4 / WORDS of the titles
+WORDS = 5000
+
+# main.py initializes its database on import, keep that file out of this folder
+directory = tempfile.mkdtemp(prefix="search-bench-")
+os.chdir(directory)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from database import ConnectionPool, MIGRATIONS
+from main import list_todos_query
+
+
+def word(number: int):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    text = ""
+    number += WORDS
+    while number:
+        number, digit = divmod(number, len(letters))
+        text += letters[digit]
+    return text
+
+
+def create_database(path: str, size: int):
+    rng = random.Random(size)
+    conn = sqlite3.connect(path)
+    for migration in MIGRATIONS:
+        migration(conn)
+    now = datetime.now().isoformat()
+    with conn:
+        conn.executemany(
+            "INSERT INTO todos (title, completed, created_at, updated_at) VALUES (?, ?, ?, ?)",
+            ((" ".join(word(rng.randrange(WORDS)) for _ in range(4)), False, now, now) for _ in range(size)),
+        )
+    conn.close()
+
+
+def median_ms(conn, query: str, params: tuple):
+    timings = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        conn.execute(query, params).fetchall()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+if __name__ == "__main__":
+    print(f"first page of {LIMIT}, median of {REPEAT} runs")
+    for size in SIZES:
+        path = os.path.join(directory, f"todos_{size}.db")
+        create_database(path, size)
+        conn = ConnectionPool(path).dedicated()
+        # a word in ~0.08% of titles, two of them together (nearly no match), and a 2-letter prefix
+        common = word(7)
+        for label, search in (("one word", common), ("two words", f"{common} {word(8)}"), ("prefix", common[:2])):
+            fts = median_ms(conn, *list_todos_query(search=search, limit=LIMIT))
+            like = median_ms(conn, *list_todos_query(title=search, limit=LIMIT))
+            print(f"{size:>8} todos  {label:<10} search= {fts:8.3f} ms   title= (LIKE) {like:8.3f} ms")
+        conn.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    os.chdir("/")
+    shutil.rmtree(directory)
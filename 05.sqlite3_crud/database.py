@@ -0,0 +1,255 @@
+import re
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+DB_FILE = "sqlite_3_todos.db"
+
+
+# One connection per thread, reused across requests
+# the routes are sync `def` handlers, so each threadpool worker keeps its own connection open
+# instead of opening the file and parsing the schema on every call
+# the connection lives as long as its thread: anyio retires threadpool threads after 10 s idle,
+# and the holder in the thread's local storage then goes away and its finalizer closes the connection
+class ConnectionPool:
+    PRAGMAS = (
+        "PRAGMA journal_mode = WAL",  # readers no longer wait for writers
+        "PRAGMA synchronous = NORMAL",  # safe with WAL, fsync only at checkpoints
+        # 8 MiB private page cache per connection, at most 320 MiB across the 40 threadpool threads;
+        # reads mostly go through the memory map, which is the OS page cache shared by all of them
+        "PRAGMA cache_size = -8192",
+        "PRAGMA mmap_size = 268435456",  # read pages through a 256 MiB memory map
+        "PRAGMA temp_store = MEMORY",
+        "PRAGMA busy_timeout = 5000",
+    )
+
+    def __init__(self, db_file: str, cached_statements: int = 256):
+        self.db_file = db_file
+        self.cached_statements = cached_statements
+        self._local = threading.local()
+        # weak, so a thread's connection is not kept open after the thread exits
+        self._holders = weakref.WeakSet()
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_file,
+            cached_statements=self.cached_statements,
+            check_same_thread=False,  # closed from whichever thread drops the holder, or by close_all
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        return conn
+
+    # A private connection the caller must close, for work that outlives a single handler call
+    def dedicated(self):
+        return self._connect()
+
+    def connection(self):
+        holder = getattr(self._local, "holder", None)
+        if holder is None:
+            holder = self._local.holder = _ThreadConnection(self._connect())
+            self._holders.add(holder)
+        return holder.conn
+
+    def open_connections(self):
+        return len(self._holders)
+
+    def close_all(self):
+        for holder in list(self._holders):
+            holder.close()
+        self._local = threading.local()
+
+
+class _ThreadConnection:
+    __slots__ = ("conn", "close", "__weakref__")
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.close = weakref.finalize(self, conn.close)
+
+
+pool = ConnectionPool(DB_FILE)
+
+
+# Schema migrations, applied in order at startup
+# the schema version is stored in PRAGMA user_version, migration N moves the database to version N
+# databases created before migrations existed are at version 0, so migration 1 must tolerate
+# objects that already exist
+def create_todos(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS todos (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        title TEXT NOT NULL,
+        completed BOOLEAN NOT NULL DEFAULT 0,
+        created_at TEXT NOT NULL,
+        updated_at TEXT NOT NULL
+    )
+    """)
+    init_fts(conn)
+
+
+# Full-text index over todos.title, an external-content FTS5 table kept in sync by triggers
+# prefix='2 3' adds prefix indexes so short `term*` queries do not walk the whole term list
+def init_fts(conn):
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'todos_fts'"
+    ).fetchone()
+    conn.execute("""
+    CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(
+        title,
+        content = 'todos',
+        content_rowid = 'id',
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS todos_fts_insert AFTER INSERT ON todos BEGIN
+        INSERT INTO todos_fts (rowid, title) VALUES (new.id, new.title);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS todos_fts_delete AFTER DELETE ON todos BEGIN
+        INSERT INTO todos_fts (todos_fts, rowid, title) VALUES ('delete', old.id, old.title);
+    END
+    """)
+    conn.execute("""
+    CREATE TRIGGER IF NOT EXISTS todos_fts_update AFTER UPDATE OF title ON todos BEGIN
+        INSERT INTO todos_fts (todos_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO todos_fts (rowid, title) VALUES (new.id, new.title);
+    END
+    """)
+    if not exists:
+        # backfill rows written before the index existed
+        conn.execute("INSERT INTO todos_fts (todos_fts) VALUES ('rebuild')")
+
+
+# Indexes for the list route: the completed filter seeks on (completed, rowid)
+# nothing sorts or filters on created_at, ids grow with creation time so id order is creation order
+def add_list_indexes(conn):
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_todos_completed ON todos (completed)")
+
+
+# Collection version for list ETags: one counter row bumped by every insert, update and delete,
+# so checking whether any list changed is a single-row read
+def add_todos_version(conn):
+    conn.execute("""
+    CREATE TABLE IF NOT EXISTS todos_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    )
+    """)
+    conn.execute("INSERT OR IGNORE INTO todos_version (id, version) VALUES (1, 0)")
+    for event in ("INSERT", "UPDATE", "DELETE"):
+        conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS todos_version_{event.lower()} AFTER {event} ON todos BEGIN
+            UPDATE todos_version SET version = version + 1 WHERE id = 1;
+        END
+        """)
+
+
+MIGRATIONS = [
+    create_todos,
+    add_list_indexes,
+    add_todos_version,
+]
+
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    while schema_version(conn) < len(MIGRATIONS):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # re-read under the write lock, another worker may have migrated meanwhile
+            version = schema_version(conn)
+            if version < len(MIGRATIONS):
+                MIGRATIONS[version](conn)
+                conn.execute(f"PRAGMA user_version = {version + 1}")
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+def init_db():
+    migrate(pool.connection())
+
+
+# Run a statement on this thread's connection, committing on success
+def query_db(query: str, args: tuple = (), one: bool = False):
+    conn = pool.connection()
+    with conn:
+        rows = conn.execute(query, args).fetchall()
+    return (rows[0] if rows else None) if one else rows
+
+
+# Yield the rows of a read query in batches of `batch_size`
+# a streaming response advances this generator from whichever threadpool thread is free,
+# so it reads through its own connection instead of the per-thread one
+def stream_db(query: str, args: tuple = (), batch_size: int = 1000):
+    conn = pool.dedicated()
+    try:
+        cursor = conn.execute(query, args)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+
+def todos_version():
+    return query_db("SELECT version FROM todos_version WHERE id = 1", one=True)["version"]
+
+
+# Run several statements in one write transaction on this thread's connection
+# BEGIN IMMEDIATE takes the write lock up front, so rowids handed out inside are contiguous
+@contextmanager
+def transaction():
+    conn = pool.connection()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+# Tables that a query reads with a full scan, from EXPLAIN QUERY PLAN
+# "SCAN todos" is a full scan; "SCAN todos USING INDEX ...", "SEARCH ..." and
+# "SCAN todos_fts VIRTUAL TABLE INDEX ..." (an FTS5 MATCH lookup) are not
+# neither is a plain "SCAN todos" in the outer loop of an unfiltered query with a LIMIT, no OFFSET
+# and no sort step: it walks the table in rowid order and stops after LIMIT rows, like the first
+# page of the list route; with a WHERE filter the walk can read any number of rows before LIMIT of
+# them match, so that still counts as a full scan
+def full_scans(query: str, args: tuple = ()):
+    conn = pool.connection()
+    plan = conn.execute(f"EXPLAIN QUERY PLAN {query}", args).fetchall()
+    bounded = (
+        re.search(r"\bLIMIT\b", query, re.IGNORECASE) is not None
+        and re.search(r"\bOFFSET\b", query, re.IGNORECASE) is None
+        and re.search(r"\bWHERE\b", query, re.IGNORECASE) is None
+        and not any(row["detail"].startswith("USE TEMP B-TREE") for row in plan)
+    )
+    scans = []
+    for index, row in enumerate(plan):
+        detail = row["detail"]
+        if detail.startswith("SCAN ") and " USING " not in detail and " VIRTUAL TABLE " not in detail:
+            if bounded and index == 0 and row["parent"] == 0:
+                continue
+            scans.append(detail[len("SCAN "):].split(" ")[0])
+    return scans
+
+
+# Fail when a query falls back to a full table scan, for tests guarding the indexes
+def assert_indexed(query: str, args: tuple = ()):
+    scans = full_scans(query, args)
+    if scans:
+        raise AssertionError(f"full scan of {', '.join(scans)} in: {query.strip()}")
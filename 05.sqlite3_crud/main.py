@@ -1,39 +1,28 @@
-import sqlite3
-from fastapi import FastAPI, HTTPException, Query, Body
+import base64
+import csv
+import hashlib
+import io
+import json
+import re
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Query, Body, Header, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, List
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from database import pool, init_db, query_db, stream_db, transaction, todos_version
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    pool.close_all()
 
-# Database setup
-DB_FILE = "sqlite_3_todos.db"
-
-def init_db():
-    with sqlite3.connect(DB_FILE) as conn:
-        cursor = conn.cursor()
-        cursor.execute("""
-        CREATE TABLE IF NOT EXISTS todos (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title TEXT NOT NULL,
-            completed BOOLEAN NOT NULL DEFAULT 0,
-            created_at TEXT NOT NULL,
-            updated_at TEXT NOT NULL
-        )
-        """)
-        conn.commit()
+app = FastAPI(lifespan=lifespan)
 
+# Database setup
 init_db()
 
-def query_db(query: str, args: tuple = (), one: bool = False):
-    with sqlite3.connect(DB_FILE) as conn:
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        cursor.execute(query, args)
-        rows = cursor.fetchall()
-        conn.commit()
-        return (rows[0] if rows else None) if one else rows
-
 # Pydantic models for validation
 class TodoCreate(BaseModel):
     title: str
@@ -50,25 +39,204 @@ class TodoResponse(BaseModel):
     created_at: str
     updated_at: str
 
-# Routes
+class TodoBatchUpdate(TodoUpdate):
+    id: int
 
-@app.get("/api/v1/todos", response_model=List[TodoResponse])
-def get_todos(
-    title: Optional[str] = Query(None), 
-    completed: Optional[bool] = Query(None)
+class TodoBatchDelete(BaseModel):
+    ids: List[int]
+
+class BatchItemResult(BaseModel):
+    index: int
+    status: int
+    data: Optional[TodoResponse] = None
+    detail: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    message: str
+    results: List[BatchItemResult]
+
+class TodoListResponse(BaseModel):
+    data: List[TodoResponse]
+    next_cursor: Optional[str] = None
+
+# Opaque pagination cursor, wraps the sort key of the last row of the previous page
+# (the id, or the rank and id for search results)
+def encode_cursor(*values):
+    return base64.urlsafe_b64encode(":".join(repr(value) for value in values).encode()).decode()
+
+def decode_cursor(cursor: str, *types):
+    try:
+        parts = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        if len(parts) != len(types):
+            raise ValueError(cursor)
+        values = [cast(part) for cast, part in zip(types, parts)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values[0] if len(values) == 1 else values
+
+# Turn free text into an FTS5 query: every word must match, each as a prefix
+def fts_query(search: str):
+    terms = re.findall(r"\w+", search)
+    if not terms:
+        raise HTTPException(status_code=400, detail="Search must contain at least one word")
+    return " ".join(f'"{term}"*' for term in terms)
+
+MAX_BATCH_SIZE = 100_000
+
+def check_batch_size(size: int):
+    if size == 0:
+        raise HTTPException(status_code=400, detail="Batch cannot be empty")
+    if size > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Batch cannot contain more than {MAX_BATCH_SIZE} items")
+
+# Fetch rows by id inside a transaction, ids are passed as one json array to avoid the bound-parameter limit
+def fetch_by_ids(conn, ids: List[int]):
+    rows = conn.execute(
+        "SELECT * FROM todos WHERE id IN (SELECT value FROM json_each(?))",
+        (json.dumps(ids),),
+    ).fetchall()
+    return {row["id"]: dict(row) for row in rows}
+
+# SQL and parameters for the list route, also used to check its query plans against the indexes
+def list_todos_query(
+    title: Optional[str] = None,
+    completed: Optional[bool] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    search: Optional[str] = None
 ):
-    query = "SELECT * FROM todos WHERE 1=1"
-    params = []
+    conditions, params = [], []
+    if search:
+        # full-text mode: ranked by bm25 through the FTS5 index, words match as prefixes
+        query = """
+            SELECT todos.*, todos_fts.rank AS rank
+            FROM todos_fts JOIN todos ON todos.id = todos_fts.rowid
+        """
+        conditions.append("todos_fts MATCH ?")
+        params.append(fts_query(search))
+    else:
+        query = "SELECT * FROM todos"
 
     if title:
-        query += " AND title LIKE ?"
+        conditions.append("todos.title LIKE ?")
         params.append(f"%{title}%")
     if completed is not None:
-        query += " AND completed = ?"
+        conditions.append("todos.completed = ?")
         params.append(1 if completed else 0)
 
-    todos = query_db(query, tuple(params))
-    return [dict(todo) for todo in todos]
+    # keyset pagination: seek past the cursor on the sort key
+    if cursor:
+        if search:
+            rank, last_id = decode_cursor(cursor, float, int)
+            conditions.append("(todos_fts.rank > ? OR (todos_fts.rank = ? AND todos.id > ?))")
+            params.extend([rank, rank, last_id])
+        else:
+            conditions.append("todos.id > ?")
+            params.append(decode_cursor(cursor, int))
+
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY todos_fts.rank, todos.id" if search else " ORDER BY todos.id"
+    if limit:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    return query, tuple(params)
+
+# Conditional GET: a todo's ETag hashes id and updated_at, a list's hashes the collection version
+def make_etag(*parts):
+    return '"' + hashlib.md5("|".join(str(part) for part in parts).encode()).hexdigest() + '"'
+
+def etag_matches(if_none_match: Optional[str], etag: str):
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in (tag.removeprefix("W/") for tag in tags)
+
+# updated_at is stored as datetime.utcnow().isoformat(), so it is naive UTC
+def cache_headers(etag: str, last_modified: Optional[str] = None):
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if last_modified is not None:
+        modified = datetime.fromisoformat(last_modified).replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(modified, usegmt=True)
+    return headers
+
+def not_modified(headers: dict):
+    return Response(status_code=304, headers=headers)
+
+# Routes
+
+@app.get("/api/v1/todos", response_model=TodoListResponse)
+def get_todos(
+    response: Response,
+    title: Optional[str] = Query(None), 
+    completed: Optional[bool] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    search: Optional[str] = Query(None),
+    if_none_match: Optional[str] = Header(None)
+):
+    # read before the list query: a write landing in between makes the ETag older than the body,
+    # which only costs the client one extra full response
+    headers = cache_headers(make_etag(todos_version()))
+    if etag_matches(if_none_match, headers["ETag"]):
+        return not_modified(headers)
+    response.headers.update(headers)
+
+    # fetch one extra row to detect a next page
+    query, params = list_todos_query(title, completed, limit + 1 if limit else None, cursor, search)
+    todos = query_db(query, params)
+    next_cursor = None
+    if limit and len(todos) > limit:
+        todos = todos[:limit]
+        last = todos[-1]
+        next_cursor = encode_cursor(last["rank"], last["id"]) if search else encode_cursor(last["id"])
+    return {"data": [dict(todo) for todo in todos], "next_cursor": next_cursor}
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FIELDS = ["id", "title", "completed", "created_at", "updated_at"]
+
+def export_row(row):
+    todo = dict(row)
+    todo["completed"] = bool(todo["completed"])
+    return todo
+
+# Encode each batch of rows as one chunk, so memory stays at one batch however many rows match
+def export_ndjson(batches):
+    for rows in batches:
+        yield "".join(json.dumps(export_row(row)) + "\n" for row in rows)
+
+def export_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    yield buffer.getvalue()
+    for rows in batches:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(export_row(row) for row in rows)
+        yield buffer.getvalue()
+
+# Export route, ahead of /{todo_id}
+@app.get("/api/v1/todos/export")
+def export_todos(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    title: Optional[str] = Query(None),
+    completed: Optional[bool] = Query(None)
+):
+    query, params = list_todos_query(title, completed)
+    batches = stream_db(query, params, batch_size=EXPORT_BATCH_SIZE)
+    if format == "csv":
+        return StreamingResponse(
+            export_csv(batches),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=todos.csv"},
+        )
+    return StreamingResponse(
+        export_ndjson(batches),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": "attachment; filename=todos.ndjson"},
+    )
 
 @app.post("/api/v1/todos", response_model=TodoResponse, status_code=201)
 def create_todo(todo: TodoCreate):
@@ -76,62 +244,130 @@ def create_todo(todo: TodoCreate):
     query = """
         INSERT INTO todos (title, completed, created_at, updated_at)
         VALUES (?, ?, ?, ?)
+        RETURNING *
     """
     params = (todo.title, todo.completed, created_at, updated_at)
+    new_todo = query_db(query, params, one=True)
+    return dict(new_todo)
+
+# Batch routes, ahead of /{todo_id}
+# each batch runs in one transaction and reports a result per item, in request order
+
+@app.post("/api/v1/todos/batch", response_model=BatchResponse, status_code=201)
+def create_todos_batch(todos: List[TodoCreate]):
+    check_batch_size(len(todos))
+    created_at = updated_at = datetime.utcnow().isoformat()
+    params = [(todo.title, 1 if todo.completed else 0, created_at, updated_at) for todo in todos]
+
+    with transaction() as conn:
+        conn.executemany("""
+            INSERT INTO todos (title, completed, created_at, updated_at)
+            VALUES (?, ?, ?, ?)
+        """, params)
+        last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+
+    first_id = last_id - len(todos) + 1
+    results = [
+        {
+            "index": index,
+            "status": 201,
+            "data": {
+                "id": first_id + index,
+                "title": todo.title,
+                "completed": bool(todo.completed),
+                "created_at": created_at,
+                "updated_at": updated_at
+            }
+        }
+        for index, todo in enumerate(todos)
+    ]
+    return {"message": "Todos created successfully", "results": results}
+
+@app.put("/api/v1/todos/batch", response_model=BatchResponse)
+def update_todos_batch(todos: List[TodoBatchUpdate]):
+    check_batch_size(len(todos))
+    updated_at = datetime.utcnow().isoformat()
+    ids = [todo.id for todo in todos]
+
+    with transaction() as conn:
+        existing = fetch_by_ids(conn, ids)
+        conn.executemany("""
+            UPDATE todos
+            SET title = COALESCE(?, title), completed = COALESCE(?, completed), updated_at = ?
+            WHERE id = ?
+        """, [
+            (todo.title, None if todo.completed is None else int(todo.completed), updated_at, todo.id)
+            for todo in todos if todo.id in existing
+        ])
+        updated = fetch_by_ids(conn, [todo_id for todo_id in ids if todo_id in existing])
 
-    with sqlite3.connect(DB_FILE) as conn:
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-        todo_id = cursor.lastrowid
+    results = [
+        {"index": index, "status": 200, "data": updated[todo.id]}
+        if todo.id in updated else
+        {"index": index, "status": 404, "detail": "Todo not found"}
+        for index, todo in enumerate(todos)
+    ]
+    return {"message": "Todos updated successfully", "results": results}
 
-    new_todo = {
-        "id": todo_id,
-        "title": todo.title,
-        "completed": todo.completed,
-        "created_at": created_at,
-        "updated_at": updated_at
-    }
-    return new_todo
+@app.delete("/api/v1/todos/batch", response_model=BatchResponse)
+def delete_todos_batch(body: TodoBatchDelete):
+    check_batch_size(len(body.ids))
+
+    with transaction() as conn:
+        existing = fetch_by_ids(conn, body.ids)
+        conn.execute(
+            "DELETE FROM todos WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(list(existing)),),
+        )
+
+    # an id listed twice is only deleted once
+    deleted = set()
+    results = []
+    for index, todo_id in enumerate(body.ids):
+        if todo_id in existing and todo_id not in deleted:
+            deleted.add(todo_id)
+            results.append({"index": index, "status": 200})
+        else:
+            results.append({"index": index, "status": 404, "detail": "Todo not found"})
+    return {"message": "Todos deleted successfully", "results": results}
 
 @app.get("/api/v1/todos/{todo_id}", response_model=TodoResponse)
-def get_todo(todo_id: int):
+def get_todo(todo_id: int, response: Response, if_none_match: Optional[str] = Header(None)):
     todo = query_db("SELECT * FROM todos WHERE id = ?", (todo_id,), one=True)
     if not todo:
         raise HTTPException(status_code=404, detail="Todo not found")
+    headers = cache_headers(make_etag(todo["id"], todo["updated_at"]), todo["updated_at"])
+    if etag_matches(if_none_match, headers["ETag"]):
+        return not_modified(headers)
+    response.headers.update(headers)
     return dict(todo)
 
+# Writes are single statements with RETURNING: a missing row comes back as no row, not a separate lookup
+
 @app.put("/api/v1/todos/{todo_id}", response_model=TodoResponse)
 def update_todo(todo_id: int, updated_todo: TodoUpdate):
-    todo = query_db("SELECT * FROM todos WHERE id = ?", (todo_id,), one=True)
+    query = """
+        UPDATE todos
+        SET title = COALESCE(?, title), completed = COALESCE(?, completed), updated_at = ?
+        WHERE id = ?
+        RETURNING *
+    """
+    params = (
+        updated_todo.title,
+        None if updated_todo.completed is None else int(updated_todo.completed),
+        datetime.utcnow().isoformat(),
+        todo_id,
+    )
+    todo = query_db(query, params, one=True)
     if not todo:
         raise HTTPException(status_code=404, detail="Todo not found")
-
-    fields = []
-    params = []
-
-    if updated_todo.title is not None:
-        fields.append("title = ?")
-        params.append(updated_todo.title)
-    if updated_todo.completed is not None:
-        fields.append("completed = ?")
-        params.append(1 if updated_todo.completed else 0)
-
-    params.append(datetime.utcnow().isoformat())  # updated_at
-    params.append(todo_id)
-
-    query = f"UPDATE todos SET {', '.join(fields)}, updated_at = ? WHERE id = ?"
-    query_db(query, tuple(params))
-
-    updated_todo = query_db("SELECT * FROM todos WHERE id = ?", (todo_id,), one=True)
-    return dict(updated_todo)
+    return dict(todo)
 
 @app.delete("/api/v1/todos/{todo_id}", response_model=dict)
 def delete_todo(todo_id: int):
-    todo = query_db("SELECT * FROM todos WHERE id = ?", (todo_id,), one=True)
+    todo = query_db("DELETE FROM todos WHERE id = ? RETURNING id", (todo_id,), one=True)
     if not todo:
         raise HTTPException(status_code=404, detail="Todo not found")
-
-    query_db("DELETE FROM todos WHERE id = ?", (todo_id,))
     return {"message": "Todo deleted successfully"}
 
 if __name__ == "__main__":
@@ -0,0 +1,46 @@
+import gc
+import sqlite3
+import threading
+import pytest
+from database import ConnectionPool
+
+
+def use_on_new_thread(pool, count):
+    connections = []
+
+    def work():
+        conn = pool.connection()
+        conn.execute("SELECT 1")
+        connections.append(conn)
+
+    threads = [threading.Thread(target=work) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return connections
+
+
+# anyio retires idle threadpool threads and starts new ones, each opening its own connection;
+# the retired threads' connections must be closed rather than piling up
+def test_connections_close_when_their_thread_exits(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "todos.db"))
+    for _ in range(3):
+        connections = use_on_new_thread(pool, 8)
+        gc.collect()
+        assert pool.open_connections() == 0
+        for conn in connections:
+            with pytest.raises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+
+
+def test_close_all_closes_live_threads_connections(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "todos.db"))
+    conn = pool.connection()
+    assert pool.open_connections() == 1
+    pool.close_all()
+    assert pool.open_connections() == 0
+    with pytest.raises(sqlite3.ProgrammingError):
+        conn.execute("SELECT 1")
+    assert pool.connection() is not conn
+    pool.close_all()
@@ -0,0 +1,62 @@
+import importlib
+import os
+import sys
+import pytest
+
+
+# main.py migrates sqlite_3_todos.db in the working directory when imported, so import it from
+# an empty directory; the pool's per-thread connection opens the file there
+@pytest.fixture(scope="module")
+def app_modules(tmp_path_factory):
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("db"))
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    try:
+        database = importlib.import_module("database")
+        main = importlib.import_module("main")
+        yield database, main
+        database.pool.close_all()
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.mark.parametrize("shape", [
+    {"limit": 11},
+    {"limit": 11, "cursor": 5},
+    {"completed": True},
+    {"completed": False, "limit": 11},
+    {"completed": True, "limit": 11, "cursor": 5},
+    {"search": "milk", "limit": 11},
+    {"search": "milk", "completed": False, "limit": 11},
+])
+def test_list_queries_use_an_index(app_modules, shape):
+    database, main = app_modules
+    shape = dict(shape)
+    if "cursor" in shape:
+        shape["cursor"] = main.encode_cursor(shape["cursor"])
+    database.assert_indexed(*main.list_todos_query(**shape))
+
+
+def test_unbounded_scans_are_reported(app_modules):
+    database, main = app_modules
+    assert database.full_scans(*main.list_todos_query()) == ["todos"]
+    assert database.full_scans(*main.list_todos_query(title="milk")) == ["todos"]
+    assert database.full_scans(*main.list_todos_query(title="milk", limit=11)) == ["todos"]
+    with pytest.raises(AssertionError, match="full scan of todos"):
+        database.assert_indexed("SELECT * FROM todos WHERE title = ? LIMIT 10", ("milk",))
+    with pytest.raises(AssertionError, match="full scan of todos"):
+        database.assert_indexed("SELECT * FROM todos ORDER BY id LIMIT 10 OFFSET 100000")
+    with pytest.raises(AssertionError, match="full scan of todos"):
+        database.assert_indexed("SELECT * FROM todos ORDER BY updated_at LIMIT 10")
+
+
+def test_migrations_leave_only_the_used_indexes(app_modules):
+    database, _ = app_modules
+    conn = database.pool.connection()
+    assert database.schema_version(conn) == len(database.MIGRATIONS)
+    indexes = {
+        row["name"]
+        for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'todos'")
+        if not row["name"].startswith("sqlite_autoindex")
+    }
+    assert indexes == {"idx_todos_completed"}
@@ -0,0 +1,108 @@
+import asyncio
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime
+import bcrypt
+import httpx
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+# Login throughput against the number of bcrypt worker processes, and the latency of
+# GET /api/v1/protected while those logins run: the app runs under uvicorn once per
+# PASSWORD_WORKERS value and the clients run in this process, so give it cores of its own;
+# the user it logs in as is added to MONGO_URI's database and removed at the end
+# run from this folder: python benchmark_login.py
+load_dotenv()
+MONGO_URI = os.getenv("MONGO_URI")
+# bcrypt worker processes to try, past the core count they only add queueing
+WORKERS = [int(workers) for workers in os.getenv("BENCH_WORKERS", "1,2,4,8").split(",")]
+LOGIN_CLIENTS = int(os.getenv("BENCH_LOGIN_CLIENTS", "64"))
+PROTECTED_CLIENTS = int(os.getenv("BENCH_PROTECTED_CLIENTS", "8"))
+SECONDS = float(os.getenv("BENCH_SECONDS", "10"))
+ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PORT = int(os.getenv("BENCH_PORT", "8765"))
+USERNAME = f"bench-login-{os.getpid()}"
+PASSWORD = "bench-password"
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def start_server(workers: int):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(PORT), "--log-level", "warning", "--no-access-log"],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        env={**os.environ, "PASSWORD_WORKERS": str(workers), "PASSWORD_MAX_QUEUE": str(LOGIN_CLIENTS)},
+    )
+    deadline = time.perf_counter() + 60
+    while time.perf_counter() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{PORT}/metrics").raise_for_status()
+            return server
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError(f"uvicorn with PASSWORD_WORKERS={workers} did not start")
+
+
+# Clients logging in back to back next to clients calling the protected route, until SECONDS pass
+# returns (logins per second, protected route latencies)
+async def run():
+    logins = 0
+    latencies = []
+    deadline = time.perf_counter() + SECONDS
+
+    async def login_client():
+        nonlocal logins
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=120) as client:
+            while time.perf_counter() < deadline:
+                response = await client.post("/api/v1/login", json={"username": USERNAME, "password": PASSWORD})
+                response.raise_for_status()
+                logins += 1
+
+    async def protected_client():
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{PORT}", timeout=120) as client:
+            response = await client.post("/api/v1/login", json={"username": USERNAME, "password": PASSWORD})
+            response.raise_for_status()
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                (await client.get("/api/v1/protected")).raise_for_status()
+                latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.01)  # a steady trickle of ordinary requests
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(login_client() for _ in range(LOGIN_CLIENTS)),
+        *(protected_client() for _ in range(PROTECTED_CLIENTS)),
+    )
+    return logins / (time.perf_counter() - started), latencies
+
+
+if __name__ == "__main__":
+    if not MONGO_URI:
+        raise ValueError("MONGO_URI environment variable not set")
+    users = MongoClient(MONGO_URI)["jwt_fastapi_python"]["user"]
+    now = datetime.utcnow()
+    hashed = bcrypt.hashpw(PASSWORD.encode("utf-8"), bcrypt.gensalt(ROUNDS)).decode("utf-8")
+    user_id = users.insert_one(
+        {"username": USERNAME, "password": hashed, "profile_picture": "", "created_at": now, "updated_at": now}
+    ).inserted_id
+    print(f"{os.cpu_count()} cores, bcrypt cost {ROUNDS}, {LOGIN_CLIENTS} login clients, {SECONDS:.0f}s per run")
+    try:
+        for workers in WORKERS:
+            server = start_server(workers)
+            try:
+                rate, latencies = asyncio.run(run())
+            finally:
+                server.terminate()
+                server.wait()
+            print(
+                f"{workers:>4} workers  {rate:8.1f} logins/s   protected p50 "
+                f"{percentile(latencies, 0.50) * 1000:7.2f} ms   p99 {percentile(latencies, 0.99) * 1000:8.2f} ms"
+            )
+    finally:
+        users.delete_one({"_id": user_id})
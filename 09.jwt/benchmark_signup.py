@@ -0,0 +1,95 @@
+import asyncio
+import functools
+import os
+import statistics
+import time
+import cloudinary.uploader
+import httpx
+import mongoengine
+import mongomock
+
+# Signup latency with the password hash and the profile picture upload overlapped (the route as
+# written) and one after the other; the image host is a local stand-in that sleeps BENCH_UPLOAD_MS
+# and MongoDB is mongomock, so only those two steps differ; needs mongomock installed
+# run from this folder: python benchmark_signup.py
+SIGNUPS = int(os.getenv("BENCH_SIGNUPS", "40"))
+CLIENTS = [int(clients) for clients in os.getenv("BENCH_CLIENTS", "1,8").split(",")]
+UPLOAD_MS = float(os.getenv("BENCH_UPLOAD_MS", "250"))
+IMAGE = b"\x89PNG" + bytes(64 * 1024)
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost")
+os.environ.setdefault("JWT_KEY", "bench-key")
+mongoengine.connect = functools.partial(mongoengine.connect, mongo_client_class=mongomock.MongoClient)
+
+
+def upload(file, **options):
+    file.read()
+    time.sleep(UPLOAD_MS / 1000)
+    return {"secure_url": "https://images.test/picture.png", "public_id": "picture"}
+
+
+cloudinary.uploader.upload = upload
+cloudinary.uploader.destroy = lambda public_id, **options: None
+import main
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+# asyncio.gather's signature, awaiting one step after the other as signup did before the overlap
+async def gather_sequentially(*steps, return_exceptions=False):
+    results = []
+    for step in steps:
+        try:
+            results.append(await step)
+        except Exception as error:
+            if not return_exceptions:
+                raise
+            results.append(error)
+    return results
+
+
+class SequentialAsyncio:
+    gather = staticmethod(gather_sequentially)
+
+
+async def run(clients: int, prefix: str):
+    latencies = []
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def signup(number):
+            started = time.perf_counter()
+            response = await client.post(
+                "/api/v1/signup",
+                data={"username": f"{prefix}-{number}", "password": "bench-password"},
+                files={"file": ("picture.png", IMAGE, "image/png")},
+            )
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+        for start in range(0, SIGNUPS, clients):
+            await asyncio.gather(*(signup(number) for number in range(start, min(start + clients, SIGNUPS))))
+    return latencies
+
+
+async def benchmark():
+    async with main.lifespan(main.app):
+        print(
+            f"{SIGNUPS} signups, bcrypt cost {main.password_hasher.rounds}, "
+            f"{main.password_hasher.workers} bcrypt workers, {UPLOAD_MS:.0f} ms uploads"
+        )
+        for clients in CLIENTS:
+            for name, module in (("sequential", SequentialAsyncio), ("overlapped", asyncio)):
+                main.asyncio = module
+                latencies = await run(clients, f"{name}-{clients}")
+                print(
+                    f"{clients:>3} at once  {name:<11} p50 {statistics.median(latencies) * 1000:7.1f} ms   "
+                    f"p99 {percentile(latencies, 0.99) * 1000:7.1f} ms"
+                )
+        main.asyncio = asyncio
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark())
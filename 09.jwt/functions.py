@@ -1,3 +1,5 @@
+import sys
+from pathlib import Path
 import os
 import cloudinary
 import cloudinary.uploader
@@ -7,12 +9,16 @@ from fastapi.security import OAuth2PasswordBearer
 from dotenv import load_dotenv
 from typing import Callable
 from functools import wraps
+# TokenCache is shared by the auth apps, from the shared/ folder at the top of the repo
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from shared.token_cache import TokenCache
 
 # Load environment variables
 load_dotenv()
 
 # JWT key
 JWT_KEY = os.getenv("JWT_KEY")
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
 
 # Configure Cloudinary
 cloudinary.config(
@@ -35,12 +41,29 @@ def upload_profile_picture(file):
         return {
             "message": "File uploaded successfully",
             "url": result["secure_url"],
+            "public_id": result["public_id"],
         }
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Something went wrong: {str(e)}")
 
 
+# Function to delete an uploaded profile picture, best effort: a failure is logged, not raised
+def delete_profile_picture(public_id):
+    try:
+        cloudinary.uploader.destroy(public_id)
+    except Exception as e:
+        print(f"failed to delete profile picture {public_id}: {e}")
+
+
+# Verified tokens, reused until they expire; TOKEN_CACHE_SIZE=0 disables the cache
+token_cache = TokenCache(maxsize=TOKEN_CACHE_SIZE)
+
+
+def decode_token(token: str):
+    return jwt.decode(token, JWT_KEY, algorithms=["HS256"])
+
+
 # Middleware to require JWT
 def jwt_required(request: Request):
     token = request.cookies.get("hart")  # Get token from cookies
@@ -48,7 +71,7 @@ def jwt_required(request: Request):
         raise HTTPException(status_code=401, detail="Unauthorized")
 
     try:
-        payload = jwt.decode(token, JWT_KEY, algorithms=["HS256"])
+        payload = token_cache.verify(token, decode_token)
         return payload  # Return decoded token for further processing
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
@@ -1,20 +1,49 @@
+import sys
+from pathlib import Path
 import os
+import asyncio
 from fastapi import FastAPI, HTTPException, Depends, Request, Form, File, UploadFile, Response
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 from fastapi.security import OAuth2PasswordBearer
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
-import bcrypt
 import jwt
-from mongoengine import connect, Document, StringField, DateTimeField
+from mongoengine import connect, Document, StringField, DateTimeField, NotUniqueError
 from dotenv import load_dotenv
-from functions import upload_profile_picture, jwt_required
+from functions import upload_profile_picture, delete_profile_picture, jwt_required, token_cache
+# metrics, the loop monitor and the db executor are shared by the apps, from the shared/ folder
+# at the top of the repo
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from shared.metrics import mongo_metrics
+from shared.loop_monitor import LoopMonitor
+from shared.db import DbExecutor
+from passwords import password_hasher
 
 # Load environment variables
 load_dotenv()
 
+# Event loop blocks of at least this long are reported, 0 turns the monitor off
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+loop_monitor = LoopMonitor(LOOP_BLOCK_THRESHOLD_MS / 1000)
+
+# Threads running blocking mongoengine calls for the async routes (see shared/db.py)
+DB_WORKERS = int(os.getenv("DB_WORKERS", "16"))
+db_executor = DbExecutor(DB_WORKERS)
+run_db = db_executor.run
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await password_hasher.start()
+    loop_monitor.start()
+    yield
+    await loop_monitor.stop()
+    password_hasher.close()
+    db_executor.shutdown()
+
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # JWT secret key
 JWT_KEY = os.getenv("JWT_KEY")
@@ -23,7 +52,7 @@ JWT_KEY = os.getenv("JWT_KEY")
 mongo_url = os.getenv("MONGO_URI")
 if not mongo_url:
     raise ValueError("MONGO_URI environment variable not set")
-connect("jwt_fastapi_python", host=mongo_url)
+connect("jwt_fastapi_python", host=mongo_url, event_listeners=mongo_metrics.listeners)
 
 # MongoDB User schema
 class User(Document):
@@ -65,8 +94,8 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 # Login route
 @app.post("/api/v1/login")
 async def login(data: LoginRequest):
-    user = User.objects(username=data.username).first()
-    if not user or not bcrypt.checkpw(data.password.encode("utf-8"), user.password.encode("utf-8")):
+    user = await run_db(lambda: User.objects(username=data.username).first())
+    if not user or not await password_hasher.check(data.password, user.password):
         raise HTTPException(status_code=400, detail="Username or password is incorrect")
 
     payload = {
@@ -86,18 +115,33 @@ async def login(data: LoginRequest):
 
     return response
 
+# An uploaded profile picture that no user ended up pointing at
+async def discard_profile_picture(upload):
+    await run_in_threadpool(delete_profile_picture, upload["public_id"])
+
 # Signup route
+# after the username check, hashing (process pool) and the upload (threadpool) run at the same
+# time, so signup waits for the slower of the two instead of both; if either fails, or another
+# signup takes the username before the insert (the unique index decides), the image is deleted
 @app.post("/api/v1/signup")
 async def signup(
     username: str = Form(...),
     password: str = Form(...),
     file: UploadFile = File(...),
 ):
-    if User.objects(username=username).first():
+    if await run_db(lambda: User.objects(username=username).first()):
         raise HTTPException(status_code=400, detail="Username already taken")
 
-    hashed_password = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
-    profile_url = upload_profile_picture(file.file)
+    hashed_password, profile_url = await asyncio.gather(
+        password_hasher.hash(password),
+        run_in_threadpool(upload_profile_picture, file.file),
+        return_exceptions=True,
+    )
+    for result in (hashed_password, profile_url):
+        if isinstance(result, BaseException):
+            if not isinstance(profile_url, BaseException):
+                await discard_profile_picture(profile_url)
+            raise result
 
     new_user = User(
         username=username,
@@ -106,7 +150,14 @@ async def signup(
         created_at=datetime.utcnow(),
         updated_at=datetime.utcnow(),
     )
-    new_user.save()
+    try:
+        await run_db(new_user.save)
+    except NotUniqueError:
+        await discard_profile_picture(profile_url)
+        raise HTTPException(status_code=400, detail="Username already taken")
+    except BaseException:
+        await discard_profile_picture(profile_url)
+        raise
 
     return JSONResponse(
         status_code=200,
@@ -123,7 +174,7 @@ async def logout():
 # Get current user profile route
 @app.get("/api/v1/profile")
 async def get_current_user_profile(payload: dict = Depends(jwt_required)):
-    user = User.objects(id=payload["id"]).first()
+    user = await run_db(lambda: User.objects(id=payload["id"]).first())
     if not user:
         raise HTTPException(status_code=404, detail="user not found")
 
@@ -137,6 +188,14 @@ async def get_current_user_profile(payload: dict = Depends(jwt_required)):
 async def protected(payload: dict = Depends(jwt_required)):
     return JSONResponse(content={"message": "Protected route accessed"})
 
+# Driver, password hashing, token cache and event loop metrics, in the Prometheus text format
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(
+        mongo_metrics.render() + password_hasher.render() + token_cache.render() + loop_monitor.render(),
+        media_type=mongo_metrics.CONTENT_TYPE,
+    )
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,86 @@
+import asyncio
+import functools
+import importlib
+import os
+import time
+import pytest
+from fastapi.testclient import TestClient
+
+mongomock = pytest.importorskip("mongomock")
+
+THRESHOLD_MS = 50
+
+
+# Imports main.py against an in-memory MongoDB with the loop monitor at a low threshold;
+# bcrypt runs at its lowest cost and the image host answers after a short sleep
+@pytest.fixture(scope="module")
+def main_module():
+    patch = pytest.MonkeyPatch()
+    patch.setenv("LOOP_BLOCK_THRESHOLD_MS", str(THRESHOLD_MS))
+    patch.setenv("MONGO_URI", "mongodb://localhost")
+    patch.setenv("JWT_KEY", "test-key")
+    patch.setenv("BCRYPT_ROUNDS", "4")
+    patch.setenv("PASSWORD_WORKERS", "2")
+    import cloudinary.uploader
+    import mongoengine
+
+    def upload(file, **options):
+        time.sleep(0.05)
+        return {"secure_url": "https://images.test/picture.png", "public_id": "picture"}
+
+    patch.setattr(mongoengine, "connect", functools.partial(mongoengine.connect, mongo_client_class=mongomock.MongoClient))
+    patch.setattr(cloudinary.uploader, "upload", upload)
+    patch.setattr(cloudinary.uploader, "destroy", lambda public_id, **options: None)
+    patch.syspath_prepend(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        yield importlib.import_module("main")
+    finally:
+        patch.undo()
+        mongoengine.disconnect()
+
+
+def idle(client, monitor):
+    # let the heartbeat wake up once more, so a block at the very end is recorded too
+    client.portal.call(asyncio.sleep, 2 * (monitor.interval + monitor.threshold))
+
+
+def test_routes_do_not_block_the_event_loop(main_module):
+    main = main_module
+    monitor = main.loop_monitor
+
+    with TestClient(main.app) as client:
+        for number in range(3):
+            username = f"user{number}"
+            response = client.post(
+                "/api/v1/signup",
+                data={"username": username, "password": "secret"},
+                files={"file": ("picture.png", b"\x89PNG", "image/png")},
+            )
+            assert response.status_code == 200, response.text
+            response = client.post("/api/v1/login", json={"username": username, "password": "secret"})
+            assert response.status_code == 200, response.text
+            assert client.get("/api/v1/profile").json()["data"]["username"] == username
+            assert client.get("/api/v1/protected").status_code == 200
+            assert client.post("/api/v1/logout").status_code == 200
+            client.cookies.clear()
+        idle(client, monitor)
+        monitor.assert_not_blocked()
+
+
+# The harness itself: a synchronous sleep on the loop must be caught
+def test_a_blocking_call_is_reported(main_module):
+    main = main_module
+    monitor = main.LoopMonitor(THRESHOLD_MS / 1000)
+
+    async def block():
+        time.sleep(4 * monitor.threshold)
+
+    with TestClient(main.app) as client:
+        client.portal.call(monitor.start)
+        client.portal.call(asyncio.sleep, monitor.interval)
+        client.portal.call(block)
+        idle(client, monitor)
+        client.portal.call(monitor.stop)
+    with pytest.raises(AssertionError, match="event loop blocked"):
+        monitor.assert_not_blocked()
+    assert "time.sleep" in monitor.longest_stack
@@ -1,22 +1,52 @@
+import sys
+from pathlib import Path
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from mongoengine import connect
 from .auth_routes import auth_router
 from .user_routes import user_router
 from .admin_routes import admin_router
-from config import MONGO_URI
+# metrics and the loop monitor are shared by the apps, from the shared/ folder at the top of the repo
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from shared.metrics import mongo_metrics
+from shared.loop_monitor import LoopMonitor
+from .passwords import password_hasher
+from .middleware import token_cache
+from .db import db_executor
+from config import MONGO_URI, LOOP_BLOCK_THRESHOLD_MS
+
+loop_monitor = LoopMonitor(LOOP_BLOCK_THRESHOLD_MS / 1000)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await password_hasher.start()
+    loop_monitor.start()
+    yield
+    await loop_monitor.stop()
+    password_hasher.close()
+    db_executor.shutdown()
 
 def create_app():
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
     if not MONGO_URI:
         raise ValueError("mongo_uri environment variable not set")
 
     # Connect to MongoDB
-    connect("roles_fastapi_schema", host=MONGO_URI)
+    connect("roles_fastapi_schema", host=MONGO_URI, event_listeners=mongo_metrics.listeners)
 
     # Include routers for different routes
     app.include_router(auth_router, prefix="/api/v1/auth")
     app.include_router(user_router, prefix="/api/v1/user")
     app.include_router(admin_router, prefix="/api/v1/admin")
 
+    # Driver, password hashing, token cache and event loop metrics, in the Prometheus text format
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        return PlainTextResponse(
+            mongo_metrics.render() + password_hasher.render() + token_cache.render() + loop_monitor.render(),
+            media_type=mongo_metrics.CONTENT_TYPE,
+        )
+
     return app
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
 from .middleware import jwt_required, role_required
 from .models import User
+from .db import run_db
 from fastapi.responses import JSONResponse
 
 # Initialize the router
@@ -11,7 +12,7 @@ admin_router = APIRouter()
 async def get_all_users(request: Request, _=Depends(role_required('admin'))):
     # `jwt_required` is automatically called when `role_required` is used due to Depends
     try:
-        users = User.objects.all()
+        users = await run_db(lambda: list(User.objects.all()))
         return JSONResponse(
             content={
                 'message': 'All users fetched',
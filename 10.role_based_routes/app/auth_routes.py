@@ -1,10 +1,11 @@
 from fastapi import APIRouter, Body, HTTPException, Form, File, UploadFile
 from fastapi.responses import JSONResponse
 from .models import User
-import bcrypt
+from .passwords import password_hasher
+from .db import run_db
 import jwt
 from datetime import datetime, timedelta
-from config import JWT_KEY
+from config import JWT_KEY, TOKEN_LIFETIME_SECONDS
 from pydantic import BaseModel
 
 auth_router = APIRouter()
@@ -20,15 +21,15 @@ async def login(data: LoginRequest = Body(...)):
     username = data.username
     password = data.password
     
-    user = User.objects(username=username).first()
-    if not user or not bcrypt.checkpw(password.encode("utf-8"), user.password.encode("utf-8")):
+    user = await run_db(lambda: User.objects(username=username).first())
+    if not user or not await password_hasher.check(password, user.password):
         raise HTTPException(status_code=400, detail="Username or password is incorrect")
 
     payload = {
         "id": str(user.id),
         "username": user.username,
         "role": user.role,
-        "exp": datetime.utcnow() + timedelta(hours=1),
+        "exp": datetime.utcnow() + timedelta(seconds=TOKEN_LIFETIME_SECONDS),
     }
     token = jwt.encode(payload, JWT_KEY, algorithm="HS256")
 
@@ -49,10 +50,10 @@ async def signup(
     password: str = Form(...),
     file: UploadFile = File(...),
 ):
-    if User.objects(username=username).first():
+    if await run_db(lambda: User.objects(username=username).first()):
         raise HTTPException(status_code=400, detail="Username already taken")
 
-    hashed_password = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
+    hashed_password = await password_hasher.hash(password)
 
     # Simulating saving the profile picture, you would actually store the file
     profile_url = "profile_picture_url"
@@ -65,7 +66,7 @@ async def signup(
         created_at=datetime.utcnow(),
         updated_at=datetime.utcnow(),
     )
-    new_user.save()
+    await run_db(new_user.save)
 
     return JSONResponse(
         status_code=200,
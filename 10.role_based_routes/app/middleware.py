@@ -1,10 +1,29 @@
+import sys
+from pathlib import Path
 import jwt
 from functools import wraps
-from .models import User
-from config import JWT_KEY
+from typing import Optional
+# TokenCache is shared by the auth apps, from the shared/ folder at the top of the repo
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from shared.token_cache import TokenCache
+from .roles import ROLE_CHECK_MODES, RoleCache
+from config import (
+    JWT_KEY,
+    TOKEN_CACHE_SIZE,
+    TOKEN_LIFETIME_SECONDS,
+    ROLE_CHECK_MODE,
+    ROLE_CACHE_SIZE,
+    ROLE_CACHE_TTL,
+)
 from fastapi import HTTPException, Request, Depends
 
 
+# Verified tokens, reused until they expire; TOKEN_CACHE_SIZE=0 disables the cache
+token_cache = TokenCache(maxsize=TOKEN_CACHE_SIZE)
+
+def decode_token(token: str):
+    return jwt.decode(token, JWT_KEY, algorithms=["HS256"])
+
 # JWT authentication middleware
 def jwt_required(request: Request):
     token = request.cookies.get("hart")  # Get token from cookies
@@ -12,18 +31,39 @@ def jwt_required(request: Request):
         raise HTTPException(status_code=401, detail="Unauthorized")
 
     try:
-        payload = jwt.decode(token, JWT_KEY, algorithms=["HS256"])
+        payload = token_cache.verify(token, decode_token)
         return payload  # Return decoded token for further processing
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+# Roles looked up by role_required
+role_cache = RoleCache(ROLE_CACHE_SIZE, ROLE_CACHE_TTL, TOKEN_LIFETIME_SECONDS)
+
+# Invalidation hook: call after changing or deleting a user's role
+def invalidate_user_role(user_id):
+    role_cache.invalidate(str(user_id))
+
+def user_role(token_payload: dict, mode: str):
+    user_id = token_payload["id"]
+    if mode == "token" and "role" in token_payload and role_cache.trusts_token(user_id):
+        return token_payload["role"]
+    if mode == "strict":
+        return RoleCache.load(user_id)
+    # tokens from before the role claim existed, or of users whose role changed, use the cache
+    return role_cache.role(user_id)
+
 # Role-based access control middleware
-def role_required(role: str):
+# `mode` picks how the role is checked for this route (defaults to ROLE_CHECK_MODE), e.g.
+# role_required("admin", mode="strict") for an endpoint that must not act on a stale role
+def role_required(role: str, mode: Optional[str] = None):
+    mode = mode or ROLE_CHECK_MODE
+    if mode not in ROLE_CHECK_MODES:
+        raise ValueError(f"unknown role check mode: {mode}")
+
     def wrapper(request: Request, token_payload=Depends(jwt_required)):
-        user = User.objects(id=token_payload['id']).first()
-        if user and user.role != role:
+        if user_role(token_payload, mode) != role:
             raise HTTPException(status_code=403, detail="Only admins are allowed")
         return True  # You can allow the request to proceed if the role matches
     return wrapper
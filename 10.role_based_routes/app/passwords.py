@@ -0,0 +1,107 @@
+import sys
+from pathlib import Path
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+import bcrypt
+from fastapi import HTTPException
+from config import BCRYPT_ROUNDS, PASSWORD_WORKERS, PASSWORD_MAX_QUEUE
+# metrics are shared by the apps, from the shared/ folder at the top of the repo
+sys.path.append(str(Path(__file__).resolve().parents[2]))
+from shared.metrics import Histogram
+
+
+# Run in the worker processes, so they must be importable top-level functions
+def _hash_password(password: bytes, rounds: int):
+    return bcrypt.hashpw(password, bcrypt.gensalt(rounds))
+
+
+def _check_password(password: bytes, hashed: bytes):
+    return bcrypt.checkpw(password, hashed)
+
+
+def _warm_up():
+    return None
+
+
+# bcrypt on a bounded process pool instead of the event loop
+# a hash takes 100-300 ms of CPU, inline it stalls every other request on the worker
+# all bookkeeping happens on the event loop thread, so the counters need no lock
+class PasswordHasher:
+    def __init__(self, workers: int, max_queue: int, rounds: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self._executor = None
+        self._slots = asyncio.Semaphore(workers)
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.queue_wait = Histogram()
+
+    # spawn rather than fork, the parent has MongoDB client threads
+    def _pool(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        return self._executor
+
+    # Call from the app lifespan: the pool only spawns a worker when a job finds none idle, so one
+    # job per worker at once starts them all, and the first logins do not pay for the spawns
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        executor = self._pool()
+        await asyncio.gather(*(loop.run_in_executor(executor, _warm_up) for _ in range(self.workers)))
+
+    async def _run(self, function, *args):
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(status_code=503, detail="Server is busy, try again later")
+        self.waiting += 1
+        queued_at = time.perf_counter()
+        try:
+            await self._slots.acquire()
+        finally:
+            self.waiting -= 1
+        self.queue_wait.observe(time.perf_counter() - queued_at)
+        self.running += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._pool(), function, *args)
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self._slots.release()
+
+    async def hash(self, password: str):
+        hashed = await self._run(_hash_password, password.encode("utf-8"), self.rounds)
+        return hashed.decode("utf-8")
+
+    async def check(self, password: str, hashed: str):
+        return await self._run(_check_password, password.encode("utf-8"), hashed.encode("utf-8"))
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    # Prometheus text lines, served from /metrics next to the MongoDB metrics
+    def render(self):
+        lines = []
+        for name, kind, help_text, value in (
+            ("password_pool_workers", "gauge", "Maximum concurrent bcrypt jobs.", self.workers),
+            ("password_pool_running", "gauge", "bcrypt jobs running.", self.running),
+            ("password_pool_queue_depth", "gauge", "Requests waiting for a bcrypt worker.", self.waiting),
+            ("password_pool_completed_total", "counter", "bcrypt jobs finished.", self.completed),
+            ("password_pool_rejected_total", "counter", "Requests rejected with a full queue.", self.rejected),
+        ):
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+        lines += [
+            "# HELP password_pool_queue_wait_seconds Time spent waiting for a bcrypt worker.",
+            "# TYPE password_pool_queue_wait_seconds histogram",
+        ]
+        lines += self.queue_wait.render("password_pool_queue_wait_seconds", {})
+        return "\n".join(lines) + "\n"
+
+
+password_hasher = PasswordHasher(PASSWORD_WORKERS, PASSWORD_MAX_QUEUE, BCRYPT_ROUNDS)
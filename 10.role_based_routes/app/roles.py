@@ -0,0 +1,70 @@
+import threading
+import time
+from cachetools import TTLCache
+from .models import User
+
+
+# Where role_required gets a user's role from:
+# - "token": the role claim in the signed JWT, no database access at all; a role change only
+#   reaches the token at the next login, unless this process was told about it (see below)
+# - "cache": the role cache below, the database only on a miss or after ROLE_CACHE_TTL seconds
+# - "strict": the database on every request, for endpoints that must see a change immediately
+ROLE_CHECK_MODES = ("token", "cache", "strict")
+
+
+# User id -> role, loaded from the database and kept for `ttl` seconds, a `maxsize` of 0 turns
+# the cache off and loads the role on every call
+# code that changes a user's role (or deletes a user) must call `invalidate`, which also stops
+# "token" mode from trusting that user's tokens for as long as one issued before the change
+# can still be valid
+class RoleCache:
+    def __init__(self, maxsize: int, ttl: float, token_lifetime: float):
+        self.enabled = maxsize > 0
+        self._roles = TTLCache(max(maxsize, 1), ttl)
+        # user id -> when their role changed, oldest first; never evicted by size, since dropping
+        # an entry early would let a demoted user's old token through again
+        self._changed = {}
+        self._token_lifetime = token_lifetime
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    @staticmethod
+    def load(user_id: str):
+        user = User.objects(id=user_id).only("role").first()
+        return user.role if user else None
+
+    # The user's role, None for a user that does not exist (which is not cached)
+    # a load that raced an invalidation is returned but not stored
+    def role(self, user_id: str):
+        if not self.enabled:
+            return self.load(user_id)
+        with self._lock:
+            role = self._roles.get(user_id)
+            generation = self._generation
+        if role is not None:
+            return role
+        role = self.load(user_id)
+        if role is not None:
+            with self._lock:
+                if generation == self._generation:
+                    self._roles[user_id] = role
+        return role
+
+    def trusts_token(self, user_id: str):
+        with self._lock:
+            changed_at = self._changed.get(user_id)
+            return changed_at is None or time.monotonic() - changed_at >= self._token_lifetime
+
+    def invalidate(self, user_id: str):
+        now = time.monotonic()
+        with self._lock:
+            self._generation += 1
+            self._roles.pop(user_id, None)
+            # drop the changes every token issued before them has outlived
+            while self._changed:
+                changed_user, changed_at = next(iter(self._changed.items()))
+                if now - changed_at < self._token_lifetime:
+                    break
+                del self._changed[changed_user]
+            self._changed.pop(user_id, None)
+            self._changed[user_id] = now
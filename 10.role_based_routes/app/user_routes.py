@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.responses import JSONResponse
 from .models import User
+from .db import run_db
 from .middleware import jwt_required  # Assuming this is already implemented
 from fastapi import Request
 
@@ -10,7 +11,7 @@ user_router = APIRouter()
 @user_router.get("/profile")
 async def get_current_user_profile(request: Request, payload: dict = Depends(jwt_required)):
     user_id = payload['id']
-    user = User.objects(id=user_id).first()
+    user = await run_db(lambda: User.objects(id=user_id).first())
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -5,3 +5,24 @@ load_dotenv()
 
 JWT_KEY = os.getenv("JWT_KEY")
 MONGO_URI = os.getenv("MONGO_URI")
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+# threads running blocking mongoengine calls for async routes (see shared/db.py)
+DB_WORKERS = int(os.getenv("DB_WORKERS", "16"))
+# event loop blocks of at least this long are reported, 0 turns the monitor off
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
+# how long a login token stays valid
+TOKEN_LIFETIME_SECONDS = int(os.getenv("TOKEN_LIFETIME_SECONDS", "3600"))
+
+# default role check for role_required: token, cache or strict (see app/roles.py)
+ROLE_CHECK_MODE = os.getenv("ROLE_CHECK_MODE", "cache")
+# 0 turns the role cache off, every "cache" mode check then reads the database
+ROLE_CACHE_SIZE = int(os.getenv("ROLE_CACHE_SIZE", "10000"))
+ROLE_CACHE_TTL = float(os.getenv("ROLE_CACHE_TTL", "60"))
+
+# bcrypt cost factor for new hashes, each step doubles the work
+# existing hashes carry their own cost, so changing it never breaks logins
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# processes hashing at once, and how many more requests may wait for one before we answer 503
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_MAX_QUEUE = int(os.getenv("PASSWORD_MAX_QUEUE", "256"))
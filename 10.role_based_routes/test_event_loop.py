@@ -0,0 +1,64 @@
+import asyncio
+import functools
+import importlib
+import os
+import pytest
+from fastapi.testclient import TestClient
+
+mongomock = pytest.importorskip("mongomock")
+
+
+# Builds the app against an in-memory MongoDB with the loop monitor at a low threshold,
+# and bcrypt at its lowest cost
+@pytest.fixture(scope="module")
+def app_modules():
+    patch = pytest.MonkeyPatch()
+    patch.setenv("LOOP_BLOCK_THRESHOLD_MS", "50")
+    patch.setenv("MONGO_URI", "mongodb://localhost")
+    patch.setenv("JWT_KEY", "test-key")
+    patch.setenv("BCRYPT_ROUNDS", "4")
+    patch.setenv("PASSWORD_WORKERS", "2")
+    import mongoengine
+
+    patch.setattr(mongoengine, "connect", functools.partial(mongoengine.connect, mongo_client_class=mongomock.MongoClient))
+    patch.syspath_prepend(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        app = importlib.import_module("app")
+        yield app, importlib.import_module("app.models"), importlib.import_module("app.middleware")
+    finally:
+        patch.undo()
+        mongoengine.disconnect()
+
+
+def login(client, username):
+    client.cookies.clear()
+    response = client.post("/api/v1/auth/login", json={"username": username, "password": "secret"})
+    assert response.status_code == 200, response.text
+
+
+def test_routes_do_not_block_the_event_loop(app_modules):
+    app, models, middleware = app_modules
+    monitor = app.loop_monitor
+
+    with TestClient(app.create_app()) as client:
+        for username in ("alice", "bob"):
+            response = client.post(
+                "/api/v1/auth/signup",
+                data={"username": username, "password": "secret"},
+                files={"file": ("picture.png", b"\x89PNG", "image/png")},
+            )
+            assert response.status_code == 200, response.text
+            login(client, username)
+            assert client.get("/api/v1/user/profile").json()["data"]["username"] == username
+            assert client.get("/api/v1/admin/users").status_code == 403
+
+        admin = models.User.objects(username="alice").first()
+        admin.update(role="admin")
+        middleware.invalidate_user_role(admin.id)
+        login(client, "alice")
+        assert len(client.get("/api/v1/admin/users").json()["data"]) == 2
+        assert client.post("/api/v1/auth/logout").status_code == 200
+
+        # let the heartbeat wake up once more, so a block at the very end is recorded too
+        client.portal.call(asyncio.sleep, 2 * (monitor.interval + monitor.threshold))
+        monitor.assert_not_blocked()
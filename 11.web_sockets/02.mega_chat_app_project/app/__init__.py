@@ -1,15 +1,34 @@
+import sys
+from pathlib import Path
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from mongoengine import connect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from .auth_routes import router as auth_router
 from .users_routes import router as users_router
 from .profile_routes import router as profile_router
 from .chat_routes import router as chat_router
-from config import MONGO_URI
+# metrics and the loop monitor are shared by the apps, from the shared/ folder at the top of the repo
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+from shared.metrics import mongo_metrics
+from shared.loop_monitor import LoopMonitor
+from .middleware import token_cache
+from .db import db_executor
+from config import MONGO_URI, LOOP_BLOCK_THRESHOLD_MS
 from extensions import socket_app
 
+loop_monitor = LoopMonitor(LOOP_BLOCK_THRESHOLD_MS / 1000)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    loop_monitor.start()
+    yield
+    await loop_monitor.stop()
+    db_executor.shutdown()
+
 def create_app():
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
     # Enable CORS
     app.add_middleware(
@@ -23,7 +42,7 @@ def create_app():
     # Connect to MongoDB
     if not MONGO_URI:
         raise ValueError("mongo_uri environment variable not set")
-    connect("fastapi_chat_app", host=MONGO_URI)
+    connect("fastapi_chat_app", host=MONGO_URI, event_listeners=mongo_metrics.listeners)
 
     # Register routers
     app.include_router(auth_router, prefix="/api/v1")
@@ -32,6 +51,14 @@ def create_app():
     app.include_router(chat_router, prefix="/api/v1")
     app.mount("/socket.io", socket_app)
 
+    # Driver, token cache and event loop metrics, in the Prometheus text format
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics():
+        return PlainTextResponse(
+            mongo_metrics.render() + token_cache.render() + loop_monitor.render(),
+            media_type=mongo_metrics.CONTENT_TYPE,
+        )
+
     # Initialize Socket.IO
     # socketio_app.mount_asgi_app(app)
 
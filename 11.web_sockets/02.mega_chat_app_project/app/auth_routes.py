@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Request, HTTPException, Response, Cookie
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 import requests
 import jwt
 from .models import User
+from .db import run_db
 from datetime import datetime, timedelta
 from config import JWT_KEY, default_profile_picture
 
@@ -15,7 +17,9 @@ class GoogleLoginRequest(BaseModel):
 async def google_login(data: GoogleLoginRequest, response: Response):
     try:
         access_token = data.accessToken
-        google_user_resp = requests.get(
+        # requests is blocking too, the call runs on the threadpool
+        google_user_resp = await run_in_threadpool(
+            requests.get,
             "https://www.googleapis.com/oauth2/v3/userinfo",
             headers={"Authorization": f"Bearer {access_token}"}
         )
@@ -28,7 +32,7 @@ async def google_login(data: GoogleLoginRequest, response: Response):
         if not all([google_user.get("name"), google_user.get("email"), google_user.get("picture")]):
             raise HTTPException(status_code=400, detail="Invalid Google user data")
 
-        user = User.objects(email=google_user["email"]).first()
+        user = await run_db(lambda: User.objects(email=google_user["email"]).first())
 
         if not user:
             user = User(
@@ -38,7 +42,7 @@ async def google_login(data: GoogleLoginRequest, response: Response):
                 created_at=datetime.utcnow(),
                 updated_at=datetime.utcnow()
             )
-            user.save()
+            await run_db(user.save)
 
         payload = {
             "id": str(user.id),
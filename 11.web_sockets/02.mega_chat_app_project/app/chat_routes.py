@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from .middleware import jwt_required
 from .models import Chat
+from .db import run_db
 from datetime import datetime
 from pydantic import BaseModel
 from extensions import socket
@@ -44,7 +45,7 @@ async def create_message(data: dict, current_user: dict = Depends(jwt_required))
             created_at=datetime.utcnow(),
             updated_at=datetime.utcnow()
         )
-        new_message.save()
+        await run_db(new_message.save)
 
         message_data = {
             "id": str(new_message.id),
@@ -68,14 +69,14 @@ async def create_message(data: dict, current_user: dict = Depends(jwt_required))
 async def get_messages(to_id: str, current_user: dict = Depends(jwt_required)):
     try:
         from_id = current_user["id"]
-        messages = Chat.objects(
+        messages = await run_db(lambda: list(Chat.objects(
             __raw__={
                 "$or": [
                     {"from_id": from_id, "to_id": to_id},
                     {"from_id": to_id, "to_id": from_id}
                 ]
             }
-        ).order_by('-created_at')
+        ).order_by('-created_at')))
 
         return {
             "message": "messages fetched",
@@ -101,13 +102,13 @@ async def edit_message(message_id: str, data: dict, current_user: dict = Depends
         if not data or 'message' not in data:
             raise HTTPException(status_code=400, detail="Updated message text is required")
 
-        message = Chat.objects(id=message_id, from_id=current_user["id"]).first()
+        message = await run_db(lambda: Chat.objects(id=message_id, from_id=current_user["id"]).first())
         if not message:
             raise HTTPException(status_code=404, detail="Message not found or unauthorized")
 
         message.text = data['message']
         message.updated_at = datetime.utcnow()
-        message.save()
+        await run_db(message.save)
 
         return {"message": "Message updated successfully"}
 
@@ -117,12 +118,12 @@ async def edit_message(message_id: str, data: dict, current_user: dict = Depends
 @router.delete("/message/{message_id}", response_model=dict)
 async def delete_message(message_id: str, current_user: dict = Depends(jwt_required)):
     try:
-        message = Chat.objects(id=message_id, from_id=current_user["id"]).first()
+        message = await run_db(lambda: Chat.objects(id=message_id, from_id=current_user["id"]).first())
         if not message:
             raise HTTPException(status_code=404, detail="Message not found or unauthorized")
 
         message_id = str(message.id)
-        message.delete()
+        await run_db(message.delete)
 
         room = f'message-{message.to_id}'
         await socket.emit(f'delete-chat-message-{message.to_id}', {'deletedMessageId': message_id})
@@ -0,0 +1,10 @@
+import sys
+from pathlib import Path
+from config import DB_WORKERS
+# the executor is shared by the apps, from the shared/ folder at the top of the repo
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+from shared.db import DbExecutor
+
+# async routes run their mongoengine calls through run_db (see shared/db.py)
+db_executor = DbExecutor(DB_WORKERS)
+run_db = db_executor.run
@@ -1,9 +1,20 @@
+import sys
+from pathlib import Path
 import jwt
 from functools import wraps
 from .models import User
-from config import JWT_KEY
+# TokenCache is shared by the auth apps, from the shared/ folder at the top of the repo
+sys.path.append(str(Path(__file__).resolve().parents[3]))
+from shared.token_cache import TokenCache
+from config import JWT_KEY, TOKEN_CACHE_SIZE
 from fastapi import HTTPException, Request, Depends
 
+# Verified tokens, reused until they expire; TOKEN_CACHE_SIZE=0 disables the cache
+token_cache = TokenCache(maxsize=TOKEN_CACHE_SIZE)
+
+def decode_token(token: str):
+    return jwt.decode(token, JWT_KEY, algorithms=["HS256"])
+
 # JWT authentication middleware
 def jwt_required(request: Request):
     token = request.cookies.get("hart")  # Get token from cookies
@@ -11,7 +22,7 @@ def jwt_required(request: Request):
         raise HTTPException(status_code=401, detail="Unauthorized")
 
     try:
-        payload = jwt.decode(token, JWT_KEY, algorithms=["HS256"])
+        payload = token_cache.verify(token, decode_token)
         return payload  # Return decoded token for further processing
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from .middleware import jwt_required
 from .models import User
+from .db import run_db
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -33,7 +34,7 @@ class DynamicUserProfileResponse(BaseModel):
 async def get_current_user_profile(current_user: dict = Depends(jwt_required)):
     try:
         user_id = current_user['id']
-        user = User.objects(id=user_id).first()
+        user = await run_db(lambda: User.objects(id=user_id).first())
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
@@ -55,7 +56,7 @@ async def get_current_user_profile(current_user: dict = Depends(jwt_required)):
 @router.get("/profile/{user_id}", response_model=DynamicUserProfileResponse)
 async def get_dynamic_user_profile(user_id: str, current_user: dict = Depends(jwt_required)):
     try:
-        user = User.objects(id=user_id).first()
+        user = await run_db(lambda: User.objects(id=user_id).first())
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
 
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from .middleware import jwt_required
 from .models import User
+from .db import run_db
 from pydantic import BaseModel
 
 router = APIRouter()
@@ -20,7 +21,7 @@ class UsersResponse(BaseModel):
 @router.get("/users", response_model=UsersResponse)
 async def get_all_users(current_user: dict = Depends(jwt_required)):
     try:
-        users = User.objects.all()
+        users = await run_db(lambda: list(User.objects.all()))
         return {
             "message": "users fetched",
             "data": [
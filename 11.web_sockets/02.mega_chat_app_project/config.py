@@ -5,6 +5,12 @@ load_dotenv()
 
 JWT_KEY = os.getenv("JWT_KEY")
 MONGO_URI = os.getenv("MONGO_URI")
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+# threads running blocking mongoengine calls for async routes (see shared/db.py)
+DB_WORKERS = int(os.getenv("DB_WORKERS", "16"))
+# event loop blocks of at least this long are reported, 0 turns the monitor off
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "100"))
 CLOUDINARY_CLOUD_NAME = os.getenv("CLOUDINARY_CLOUD_NAME")
 CLOUDINARY_API_KEY = os.getenv("CLOUDINARY_API_KEY")
 CLOUDINARY_API_SECRET = os.getenv("CLOUDINARY_API_SECRET")
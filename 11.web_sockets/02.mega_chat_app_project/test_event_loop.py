@@ -0,0 +1,75 @@
+import asyncio
+import functools
+import importlib
+import os
+import time
+import pytest
+import requests
+from fastapi.testclient import TestClient
+
+mongomock = pytest.importorskip("mongomock")
+
+
+class GoogleUserInfo:
+    status_code = 200
+
+    def __init__(self, email):
+        self.email = email
+
+    def json(self):
+        return {"name": self.email.split("@")[0], "email": self.email, "picture": "https://images.test/p.png"}
+
+
+# Builds the app against an in-memory MongoDB with the loop monitor at a low threshold;
+# Google's userinfo endpoint answers after a short sleep, with the access token as the email
+@pytest.fixture(scope="module")
+def app_module():
+    patch = pytest.MonkeyPatch()
+    patch.setenv("LOOP_BLOCK_THRESHOLD_MS", "50")
+    patch.setenv("MONGO_URI", "mongodb://localhost")
+    patch.setenv("JWT_KEY", "test-key")
+    import mongoengine
+
+    def userinfo(url, headers):
+        time.sleep(0.05)
+        return GoogleUserInfo(headers["Authorization"].removeprefix("Bearer "))
+
+    patch.setattr(mongoengine, "connect", functools.partial(mongoengine.connect, mongo_client_class=mongomock.MongoClient))
+    patch.setattr(requests, "get", userinfo)
+    patch.syspath_prepend(os.path.dirname(os.path.abspath(__file__)))
+    try:
+        yield importlib.import_module("app")
+    finally:
+        patch.undo()
+        mongoengine.disconnect()
+
+
+def login(client, email):
+    client.cookies.clear()
+    response = client.post("/api/v1/google-login", json={"accessToken": email})
+    assert response.status_code == 200, response.text
+    return client.get("/api/v1/profile").json()["data"]["id"]
+
+
+def test_routes_do_not_block_the_event_loop(app_module):
+    monitor = app_module.loop_monitor
+
+    # the login cookie is marked secure, so talk to the app over https
+    with TestClient(app_module.create_app(), base_url="https://testserver") as client:
+        bob = login(client, "bob@example.com")
+        alice = login(client, "alice@example.com")
+        assert len(client.get("/api/v1/users").json()["data"]) == 2
+        assert client.get(f"/api/v1/profile/{bob}").json()["data"]["username"] == "bob"
+
+        sent = client.post("/api/v1/message", json={"to_id": bob, "message": "hi"}).json()["data"]
+        assert client.put(f"/api/v1/message/{sent['id']}", json={"message": "hi bob"}).status_code == 200
+        login(client, "bob@example.com")
+        messages = client.get(f"/api/v1/messages/{alice}").json()["data"]
+        assert [message["text"] for message in messages] == ["hi bob"]
+        login(client, "alice@example.com")
+        assert client.delete(f"/api/v1/message/{sent['id']}").status_code == 200
+        assert client.post("/api/v1/logout").status_code == 200
+
+        # let the heartbeat wake up once more, so a block at the very end is recorded too
+        client.portal.call(asyncio.sleep, 2 * (monitor.interval + monitor.threshold))
+        monitor.assert_not_blocked()
@@ -0,0 +1,43 @@
+import os
+import timeit
+from datetime import datetime, timedelta
+import jwt
+from token_cache import TokenCache
+
+# Per-request cost of authenticating a cookie: jwt.decode on every request (TOKEN_CACHE_SIZE=0)
+# against a hit in the verified-token cache, for the login payloads of the jwt and chat apps
+# run from this folder: python benchmark_token_cache.py
+NUMBER = int(os.getenv("BENCH_NUMBER", "100000"))
+KEY = "benchmark-key"
+PAYLOADS = {
+    "jwt app": {"id": "65a1f0c2e4b0a1b2c3d4e5f6", "username": "someone"},
+    "chat app": {
+        "id": "65a1f0c2e4b0a1b2c3d4e5f6",
+        "username": "Some One",
+        "email": "someone@example.com",
+        "profile_picture": "https://lh3.googleusercontent.com/a/" + "x" * 80,
+        "created_at": "2025-01-01T00:00:00",
+        "updated_at": "2025-01-01T00:00:00",
+    },
+}
+
+
+def decode(token: str):
+    return jwt.decode(token, KEY, algorithms=["HS256"])
+
+
+def per_call_us(function):
+    return min(timeit.repeat(function, number=NUMBER, repeat=5)) / NUMBER * 1e6
+
+
+if __name__ == "__main__":
+    print(f"best of 5 runs of {NUMBER} calls")
+    for name, payload in PAYLOADS.items():
+        token = jwt.encode({**payload, "exp": datetime.utcnow() + timedelta(hours=1)}, KEY, algorithm="HS256")
+        disabled = TokenCache(maxsize=0)
+        cache = TokenCache(maxsize=10000)
+        cache.verify(token, decode)
+        assert cache.verify(token, decode) == decode(token)
+        miss = per_call_us(lambda: disabled.verify(token, decode))
+        hit = per_call_us(lambda: cache.verify(token, decode))
+        print(f"{name:<9} ({len(token)} byte token)  jwt.decode {miss:6.2f} us   cache hit {hit:6.2f} us   {miss / hit:4.1f}x")
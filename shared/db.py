@@ -0,0 +1,18 @@
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+# mongoengine is blocking, so async routes run every query through `run` on a dedicated
+# thread pool instead of calling it on the event loop
+# - a pool of its own, so slow queries cannot starve the threadpool sync dependencies run on
+# - `workers` (each app's DB_WORKERS) caps concurrent queries, keep it at or below the
+#   driver's maxPoolSize (100)
+# querysets are lazy: materialize them inside the call, e.g. run_db(lambda: list(User.objects))
+class DbExecutor(ThreadPoolExecutor):
+    def __init__(self, workers: int):
+        super().__init__(max_workers=workers, thread_name_prefix="mongo")
+
+    async def run(self, function, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self, functools.partial(function, *args, **kwargs))
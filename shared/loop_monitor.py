@@ -0,0 +1,110 @@
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from .metrics import Histogram
+
+
+# Event loop blocking detector
+# - a heartbeat task sleeps `interval` seconds in a loop; when it wakes up `threshold` or more
+#   late, something held the loop that long and the block is recorded
+# - a watchdog thread notices a heartbeat that is overdue while the block is still happening
+#   and captures the loop thread's stack, which names the blocking call
+# blocks are printed, counted on /metrics and checked by `assert_not_blocked`, so a test or CI
+# job that drives the routes with the monitor running catches code that blocks the loop
+# a `threshold` of 0 turns the monitor off
+class LoopMonitor:
+    def __init__(self, threshold: float, interval: float = None):
+        self.enabled = threshold > 0
+        self.threshold = threshold
+        self.interval = interval or threshold / 4
+        self.blocked_total = 0
+        self.longest = 0.0
+        self.longest_stack = None
+        self.durations = Histogram()
+        self._lock = threading.Lock()
+        self._stack = None
+        self._last_tick = time.monotonic()
+        self._loop_thread = None
+        self._task = None
+        self._watchdog = None
+        self._stopped = threading.Event()
+
+    # Call from the event loop, e.g. in the app lifespan
+    def start(self):
+        if not self.enabled:
+            return
+        self._loop_thread = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._watchdog.join()
+        self._task = None
+
+    async def _heartbeat(self):
+        while True:
+            self._last_tick = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = time.monotonic() - self._last_tick - self.interval
+            if lag >= self.threshold:
+                self._record(lag)
+            else:
+                with self._lock:
+                    self._stack = None
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval):
+            if time.monotonic() - self._last_tick < self.interval + self.threshold:
+                continue
+            with self._lock:
+                if self._stack is not None:
+                    continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                stack = "".join(traceback.format_stack(frame))
+                with self._lock:
+                    self._stack = stack
+
+    def _record(self, duration: float):
+        with self._lock:
+            stack, self._stack = self._stack, None
+        self.blocked_total += 1
+        self.durations.observe(duration)
+        if duration > self.longest:
+            self.longest = duration
+            self.longest_stack = stack
+        print(f"warning: event loop blocked for {duration * 1000:.0f} ms")
+        if stack:
+            print(stack, end="")
+
+    def assert_not_blocked(self):
+        if self.blocked_total:
+            raise AssertionError(
+                f"event loop blocked {self.blocked_total} times, longest {self.longest * 1000:.0f} ms"
+                + (f", in:\n{self.longest_stack}" if self.longest_stack else "")
+            )
+
+    # Prometheus text lines, served from /metrics
+    def render(self):
+        lines = [
+            "# HELP event_loop_blocked_total Times the event loop was blocked past the threshold.",
+            "# TYPE event_loop_blocked_total counter",
+            f"event_loop_blocked_total {self.blocked_total}",
+            "# HELP event_loop_block_seconds How long each reported block lasted.",
+            "# TYPE event_loop_block_seconds histogram",
+        ]
+        lines += self.durations.render("event_loop_block_seconds", {})
+        return "\n".join(lines) + "\n"
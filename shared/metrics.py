@@ -0,0 +1,201 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+from pymongo import monitoring
+
+# Latency histogram bucket bounds, in seconds
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    # Prometheus text lines, bucket counts are cumulative
+    def render(self, name: str, labels: dict):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), self.counts):
+            cumulative += count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{name}_bucket{format_labels({**labels, 'le': le})} {cumulative}")
+        lines.append(f"{name}_sum{format_labels(labels)} {self.sum}")
+        lines.append(f"{name}_count{format_labels(labels)} {self.count}")
+        return lines
+
+
+def format_labels(labels: dict):
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels.items():
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+# Latency of every command the driver sends, by command name and collection
+class CommandMetrics(monitoring.CommandListener):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._collections = {}  # in-flight commands, (connection, request id) -> collection
+        self.latency = defaultdict(Histogram)
+        self.failures = defaultdict(int)
+
+    @staticmethod
+    def _collection(event):
+        if event.command_name == "getMore":
+            return event.command.get("collection", "")
+        value = event.command.get(event.command_name)
+        return value if isinstance(value, str) else ""
+
+    def started(self, event):
+        with self._lock:
+            self._collections[(event.connection_id, event.request_id)] = self._collection(event)
+
+    def _finished(self, event, failed: bool):
+        with self._lock:
+            collection = self._collections.pop((event.connection_id, event.request_id), "")
+            key = (event.command_name, collection)
+            self.latency[key].observe(event.duration_micros / 1_000_000)
+            if failed:
+                self.failures[key] += 1
+
+    def succeeded(self, event):
+        self._finished(event, failed=False)
+
+    def failed(self, event):
+        self._finished(event, failed=True)
+
+    def render(self):
+        with self._lock:
+            lines = [
+                "# HELP mongodb_command_duration_seconds MongoDB command latency.",
+                "# TYPE mongodb_command_duration_seconds histogram",
+            ]
+            for (command, collection), histogram in sorted(self.latency.items()):
+                labels = {"command": command, "collection": collection}
+                lines += histogram.render("mongodb_command_duration_seconds", labels)
+            lines += [
+                "# HELP mongodb_command_failures_total MongoDB commands that returned an error.",
+                "# TYPE mongodb_command_failures_total counter",
+            ]
+            for (command, collection), count in sorted(self.failures.items()):
+                labels = {"command": command, "collection": collection}
+                lines.append(f"mongodb_command_failures_total{format_labels(labels)} {count}")
+            return lines
+
+
+# Connection pool state per server: open and checked-out connections, requests waiting for a
+# connection, and how long a checkout waited
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.max_size = {}
+        self.connections = defaultdict(int)
+        self.checked_out = defaultdict(int)
+        self.waiting = defaultdict(int)
+        self.checkout_wait = defaultdict(Histogram)
+        self.checkout_failures = defaultdict(int)
+
+    @staticmethod
+    def _address(event):
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def pool_created(self, event):
+        with self._lock:
+            self.max_size[self._address(event)] = event.options.get("maxPoolSize", 100)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections[self._address(event)] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections[self._address(event)] -= 1
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self.waiting[self._address(event)] += 1
+
+    def connection_check_out_failed(self, event):
+        address = self._address(event)
+        with self._lock:
+            self.waiting[address] -= 1
+            self.checkout_wait[address].observe(event.duration)
+            self.checkout_failures[(address, event.reason)] += 1
+
+    def connection_checked_out(self, event):
+        address = self._address(event)
+        with self._lock:
+            self.waiting[address] -= 1
+            self.checked_out[address] += 1
+            self.checkout_wait[address].observe(event.duration)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out[self._address(event)] -= 1
+
+    def render(self):
+        with self._lock:
+            lines = []
+            for name, help_text, values in (
+                ("mongodb_pool_max_size", "Configured maximum pool size.", self.max_size),
+                ("mongodb_pool_connections", "Open connections, idle or in use.", self.connections),
+                ("mongodb_pool_checked_out", "Connections currently checked out.", self.checked_out),
+                ("mongodb_pool_waiting", "Requests waiting to check out a connection.", self.waiting),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge"]
+                for address, value in sorted(values.items()):
+                    lines.append(f"{name}{format_labels({'address': address})} {value}")
+            lines += [
+                "# HELP mongodb_pool_checkout_wait_seconds Time spent waiting to check out a connection.",
+                "# TYPE mongodb_pool_checkout_wait_seconds histogram",
+            ]
+            for address, histogram in sorted(self.checkout_wait.items()):
+                lines += histogram.render("mongodb_pool_checkout_wait_seconds", {"address": address})
+            lines += [
+                "# HELP mongodb_pool_checkout_failures_total Checkouts that failed, by reason.",
+                "# TYPE mongodb_pool_checkout_failures_total counter",
+            ]
+            for (address, reason), count in sorted(self.checkout_failures.items()):
+                labels = {"address": address, "reason": reason}
+                lines.append(f"mongodb_pool_checkout_failures_total{format_labels(labels)} {count}")
+            return lines
+
+
+# Driver metrics for one app, passed to the client as `event_listeners=mongo_metrics.listeners`
+# and served in the Prometheus text format from GET /metrics
+class MongoMetrics:
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self.commands = CommandMetrics()
+        self.pool = PoolMetrics()
+        self.listeners = [self.commands, self.pool]
+
+    def render(self):
+        return "\n".join(self.commands.render() + self.pool.render()) + "\n"
+
+
+mongo_metrics = MongoMetrics()
@@ -0,0 +1,54 @@
+import hashlib
+import threading
+import time
+from cachetools import TLRUCache
+
+
+# Verified JWT payloads, so a client reusing its cookie skips the base64, HMAC and JSON work
+# - keyed by a SHA-256 digest of the token, the raw tokens are not kept in memory
+# - each entry expires at the token's `exp` (or after `max_ttl` for tokens without one),
+#   so an expired token always goes back through jwt.decode and gets its 401
+# - only tokens that verified are stored, a bad token is decoded (and rejected) every time
+class TokenCache:
+    def __init__(self, maxsize: int, max_ttl: float = 3600):
+        self.enabled = maxsize > 0
+        self.max_ttl = max_ttl
+        self._cache = TLRUCache(max(maxsize, 1), ttu=self._expires_at, timer=time.time)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _expires_at(self, key, payload, now):
+        exp = payload.get("exp")
+        return exp if isinstance(exp, (int, float)) else now + self.max_ttl
+
+    # The payload for `token`, calling `decode` (which raises for invalid tokens) on a miss
+    # callers get a copy, so changing it cannot leak into later requests
+    def verify(self, token: str, decode):
+        if not self.enabled:
+            return decode(token)
+        key = hashlib.sha256(token.encode("utf-8")).digest()
+        with self._lock:
+            payload = self._cache.get(key)
+            if payload is not None:
+                self.hits += 1
+                return dict(payload)
+            self.misses += 1
+        payload = decode(token)
+        with self._lock:
+            self._cache[key] = payload
+        return dict(payload)
+
+    # Prometheus text lines, served from /metrics
+    def render(self):
+        with self._lock:
+            self._cache.expire()
+            size = len(self._cache) if self.enabled else 0
+            lines = []
+            for name, kind, help_text, value in (
+                ("token_cache_hits_total", "counter", "Requests authenticated from the token cache.", self.hits),
+                ("token_cache_misses_total", "counter", "Requests that had to decode their token.", self.misses),
+                ("token_cache_size", "gauge", "Verified tokens in the cache.", size),
+            ):
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+            return "\n".join(lines) + "\n"